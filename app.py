@@ -1,12 +1,19 @@
+import os
 import streamlit as st
 import pandas as pd
 import time
 from services.bitkub_service import BitkubService
 from services.line_messaging import LineMessagingService  # New Service
-from utils.indicators import calculate_indicators, check_signals
-from utils.charts import create_advanced_chart, create_rsi_chart
+from services.candle_feed import CandleFeed
+from services.screener_service import MarketScreener
+from services.background_monitor import BackgroundMonitor, DEFAULT_SYMBOLS, EMA200_EVENT_TEXT
+from services.data_api import DataAPIServer
+from services.trade_recorder import TradeRecorder
+from utils.signal_rules import DEFAULT_RULESET, summarize_direction, BUY, SELL
+from utils.charts import create_advanced_chart, create_rsi_chart, create_correlation_heatmap
+from utils.correlation import CorrelationEngine
+from utils.tick_archive import vwap, trade_imbalance
 
-import threading
 from datetime import datetime
 
 # Page Config
@@ -26,133 +33,39 @@ def get_line_service():
 
 line_service = get_line_service()
 
-# --- Background Monitor (Singleton) ---
-class BackgroundMonitor:
-    def __init__(self, line_service):
-        self.line_service = line_service
-        self.is_running = False
-        self.last_alert_dict = {} # Thread-safe alert history
-        self.symbols = ['BTC_THB', 'ETH_THB', 'SCRT_THB', 'POW_THB', 'SPEC_THB'] # Sync with main list if possible, or pass in
-        self.thread = None
-        self.last_hourly_report_time = time.time()
-
-    def start(self):
-        if not self.is_running:
-            self.is_running = True
-            self.thread = threading.Thread(target=self._run, daemon=True)
-            self.thread.start()
-            print("Background Monitor Started!")
-
-    def _format_single_message(self, sym, last_price, percent_change, sigs):
-        # Determine Action
-        action = "เฝ้าระวัง"
-        has_buy = any("สัญญาณซื้อ" in s or "แนวโน้มขาขึ้น" in s for s in sigs)
-        has_sell = any("สัญญาณขาย" in s or "แนวโน้มขาลง" in s for s in sigs)
-        if has_buy and not has_sell:
-            action = "ซื้อ"
-        elif has_sell and not has_buy:
-            action = "ขาย"
-        elif has_buy and has_sell:
-            action = "ระมัดระวัง (Mixed)"
-            
-        # Format Message
-        short_sym = sym.replace("_THB", "")
-        change_sign = "+" if percent_change >= 0 else ""
-        
-        msg = f"🪙 {short_sym}: {last_price:,.2f} ({change_sign}{percent_change:.2f}%)\n"
-        msg += f" - analyze : {action}\n"
-        
-        # Format specific alerts
-        for s in sigs:
-            icon = "🔸" # Default
-            if "ซื้อ" in s or "ขาขึ้น" in s:
-                icon = "🟢"
-            elif "ขาย" in s or "ขาลง" in s:
-                icon = "🔴"
-            
-            msg += f"  {icon} **แจ้งเตือน: {s}**\n"
-        
-        return msg
-
-    def _run(self):
-        while self.is_running:
-            try:
-                messages = []
-                hourly_messages = []
-                pending_updates = {}
-                current_time = time.time()
-                is_hourly_report = (current_time - self.last_hourly_report_time) >= 3600
-                
-                # 1. Loop through symbols
-                for sym in self.symbols:
-                    # Default Timeframe 1h for background monitoring
-                    timeframe = "1h" 
-                    try:
-                        # Fetch Candles for Signals
-                        df = bitkub.get_candles(sym, timeframe=timeframe)
-                        
-                        # Fetch Ticker for % Change
-                        ticker = bitkub.get_ticker(sym)
-                        percent_change = 0.0
-                        if ticker and isinstance(ticker, list) and len(ticker) > 0:
-                            percent_change = float(ticker[0].get('percent_change', 0))
-                        
-                        if not df.empty:
-                            df = calculate_indicators(df)
-                            sigs = check_signals(df)
-                            
-                            # Generate Message using Helper (Always needed for hourly or alerts)
-                            last_price = df['close'].iloc[-1]
-                            msg = self._format_single_message(sym, last_price, percent_change, sigs)
-
-                            # Logic A: Signal Alert (Only if signals exist and new state)
-                            if sigs:
-                                state_key = f"{sym}_{timeframe}_{df.index[-1]}"
-                                if self.last_alert_dict.get(sym) != state_key:
-                                    messages.append(msg)
-                                    pending_updates[sym] = state_key
-                            
-                            # Logic B: Hourly Report (Force Send regardless of signals)
-                            if is_hourly_report:
-                                hourly_messages.append(msg)
-
-                    except Exception as e:
-                        print(f"Bg Error {sym}: {e}")
-                
-                # 2. Send Signal Alerts (Priority)
-                if messages and self.line_service:
-                    full_msg = "🔔 สรุปราคา Crypto (Signal)\n\n" + "\n".join(messages)
-                    if self.line_service.send_message(full_msg):
-                        print(f"Sent Batch Alert: {len(messages)} symbols")
-                        self.last_alert_dict.update(pending_updates)
-
-                # 3. Send Hourly Report (Heartbeat) - Restricted to 06:00 - 22:00
-                current_hour = datetime.now().hour
-                is_active_hours = 6 <= current_hour < 22 # 06:00 to 21:59
-
-                if is_hourly_report and hourly_messages and self.line_service and is_active_hours:
-                    full_msg = "🕒 รายงานสถานะรายชั่วโมง\n\n" + "\n".join(hourly_messages)
-                    if self.line_service.send_message(full_msg):
-                        print(f"Sent Hourly Report: {len(hourly_messages)} symbols")
-                        self.last_hourly_report_time = current_time
-                elif is_hourly_report:
-                    # Reset the timer even if we suppressed the message due to hours or no service
-                    if is_hourly_report:
-                        if not is_active_hours:
-                            print(f"Hourly Report Suppressed (Hour: {current_hour})")
-                        self.last_hourly_report_time = current_time
-
-                # 3. Sleep for 60 seconds
-                time.sleep(60)
-                
-            except Exception as e:
-                print(f"Background Loop Error: {e}")
-                time.sleep(60)
+# Shared candle feed: one 15m API feed per symbol, 1h/4h/1D resampled locally
+@st.cache_resource
+def get_candle_feed():
+    return CandleFeed(bitkub)
+
+candle_feed = get_candle_feed()
+
+# Market-wide rankings shared by the dashboard and the monitor (1h indicators)
+@st.cache_resource
+def get_screener():
+    return MarketScreener(bitkub, timeframe="1h")
+
+screener = get_screener()
+
+# Rolling correlation / beta vs BTC for the dashboard watchlist, one engine per timeframe
+@st.cache_resource
+def get_correlation_engine(timeframe):
+    return CorrelationEngine(DEFAULT_SYMBOLS)
 
+# Background trade recorder: keeps every trade of the watchlist in data/ticks
+@st.cache_resource
+def start_trade_recorder():
+    recorder = TradeRecorder(DEFAULT_SYMBOLS, bitkub)
+    recorder.start()
+    return recorder
+
+trade_recorder = start_trade_recorder()
+
+# --- Background Monitor (Singleton) ---
 @st.cache_resource
 def start_background_monitor(_line_service):
     if _line_service:
-        monitor = BackgroundMonitor(_line_service)
+        monitor = BackgroundMonitor(_line_service, candle_feed, screener)
         monitor.start()
         return monitor
     return None
@@ -161,6 +74,16 @@ def start_background_monitor(_line_service):
 if line_service:
     start_background_monitor(line_service)
 
+# --- Read-only Data API for other internal tools (opt-in, Singleton) ---
+@st.cache_resource
+def start_data_api(port):
+    server = DataAPIServer(candle_feed, screener, host=os.environ.get("DATA_API_HOST", "127.0.0.1"), port=port)
+    server.start()
+    return server
+
+if os.environ.get("DATA_API_PORT"):
+    start_data_api(int(os.environ["DATA_API_PORT"]))
+
 
 def main():
     st.set_page_config(page_title="Bitkub Monitor", layout="wide")
@@ -170,7 +93,7 @@ def main():
     st.sidebar.header("การตั้งค่า")
     
     # Custom Symbol List
-    symbol_list = ['BTC_THB', 'ETH_THB', 'SCRT_THB', 'POW_THB', 'SPEC_THB']
+    symbol_list = list(DEFAULT_SYMBOLS) # Same list as the background monitor
     
     # Default to SPEC_THB
     default_symbol = 'SPEC_THB'
@@ -257,17 +180,37 @@ details > summary::-webkit-details-marker {
     # Progress bar (optional, might be distracting if fast, keeping it minimal)
     # progress_bar = st.progress(0)
 
+    # Fetch every symbol first so the signal rules run once for the whole list
+    fetch_errors = {}
+    for sym in symbol_list:
+        try:
+            # Served from the shared feed; switching timeframe needs no extra API call
+            data_cache[sym] = candle_feed.get_analyzed(sym, timeframe=timeframe)
+        except Exception as e:
+            fetch_errors[sym] = e
+
+    # Incremental correlation update (only newly closed bars), adds BTC_CORR / BTC_BETA
+    correlation = get_correlation_engine(timeframe)
+    correlation.sync(data_cache)
+    correlation.annotate(data_cache)
+    signals_by_symbol = DEFAULT_RULESET.evaluate_batch(data_cache)
+
+    # Keep screener rankings current (indicator ranks use the screener's timeframe)
+    screener.refresh_tickers(max_age=60)
+    if timeframe == screener.timeframe:
+        for sym, df in data_cache.items():
+            if not df.empty:
+                screener.update_frame(sym, df)
+
     for i, sym in enumerate(symbol_list):
         try:
-            # Fetch data (Sync loop, could be slow if many symbols but 5 is fine)
-            df = bitkub.get_candles(sym, timeframe=timeframe)
+            if sym in fetch_errors:
+                raise fetch_errors[sym]
+            df = data_cache[sym]
             
             if not df.empty:
-                df = calculate_indicators(df)
-                data_cache[sym] = df
-                
                 last_price = df['close'].iloc[-1]
-                sigs = check_signals(df)
+                sigs = signals_by_symbol[sym]
                 
                 # Determine Color & Content
                 box_color = "#262730" # Default Dark
@@ -278,23 +221,17 @@ details > summary::-webkit-details-marker {
 
                 if sigs:
                     border_style = "none"
-                    has_buy = any("สัญญาณซื้อ" in s or "แนวโน้มขาขึ้น" in s for s in sigs)
-                    has_sell = any("สัญญาณขาย" in s or "แนวโน้มขาลง" in s for s in sigs)
-                    
-                    if has_buy and not has_sell:
-                        box_color = "#28a745" # Green
-                    elif has_sell and not has_buy:
-                        box_color = "#ff4b4b" # Red
-                    elif has_buy and has_sell:
-                        box_color = "#ffa726" # Orange
-                    else:
-                        box_color = "#ff4b4b" # Fallback Red
+                    box_color = {
+                        BUY: "#28a745", # Green
+                        SELL: "#ff4b4b", # Red
+                        'mixed': "#ffa726" # Orange
+                    }.get(summarize_direction(sigs), "#ff4b4b") # Fallback Red
                     
                     status_icon = "⚠️"
                     status_text = f"{len(sigs)} สัญญาณ"
                     
                     # Create details list
-                    list_items = "".join([f"<li style='text-align:left;'>{s}</li>" for s in sigs])
+                    list_items = "".join([f"<li style='text-align:left;'>{s.message}</li>" for s in sigs])
                     details_html = f"""
 <details>
     <summary>▼ รายละเอียด</summary>
@@ -343,7 +280,42 @@ details > summary::-webkit-details-marker {
     
     st.markdown("---") # Separator
 
-    # 3. Visualization for Selected Symbol
+    # 2. Market Screener (top-k from incrementally maintained rankings)
+    ranked_pairs = screener.coverage('rsi')
+    with st.expander(f"🔎 Market Screener (RSI / EMA200: {screener.timeframe}, จัดอันดับแล้ว {ranked_pairs} คู่)"):
+        screener_queries = {
+            "Oversold ที่สุด (RSI ต่ำสุด)": ('rsi', True),
+            "Overbought ที่สุด (RSI สูงสุด)": ('rsi', False),
+            "ขึ้นแรงที่สุด (% เปลี่ยนแปลง)": ('percent_change', False),
+            "ลงแรงที่สุด (% เปลี่ยนแปลง)": ('percent_change', True),
+            "มูลค่าซื้อขายสูงสุด (Volume)": ('volume', False),
+            "เหนือ EMA200 มากที่สุด (%)": ('ema200_distance', False),
+            "ต่ำกว่า EMA200 มากที่สุด (%)": ('ema200_distance', True)
+        }
+        query = st.selectbox("ค้นหา", list(screener_queries.keys()))
+        metric, ascending = screener_queries[query]
+        ranked = screener.top(metric, k=10, ascending=ascending)
+        if ranked:
+            st.table(pd.DataFrame(ranked, columns=["เหรียญ", metric]))
+        else:
+            st.write("ยังไม่มีข้อมูล")
+
+        events = screener.recent_events(k=10)
+        if events:
+            st.caption("ตัด EMA200 ล่าสุด")
+            for e in reversed(events):
+                st.write(f"{e['symbol']}: {EMA200_EVENT_TEXT[e['event']]}")
+
+    # 3. Cross-asset correlation (is this move just BTC?)
+    with st.expander(f"🧭 ความสัมพันธ์กับ BTC ({timeframe}, {correlation.window} แท่ง)"):
+        rows = []
+        for sym in symbol_list:
+            corr, beta = correlation.latest(sym)
+            rows.append({"เหรียญ": sym, "Corr กับ BTC": round(corr, 2), "Beta กับ BTC": round(beta, 2)})
+        st.table(pd.DataFrame(rows))
+        st.plotly_chart(create_correlation_heatmap(correlation.matrix()), width="stretch")
+
+    # 4. Visualization for Selected Symbol
     col1, col2 = st.columns([3, 1])
 
     with col1:
@@ -365,9 +337,7 @@ details > summary::-webkit-details-marker {
         
         if df is None or df.empty:
              with st.spinner("กำลังดึงข้อมูลย้อนหลัง..."):
-                df = bitkub.get_candles(selected_symbol, timeframe=timeframe)
-                if not df.empty:
-                    df = calculate_indicators(df)
+                df = candle_feed.get_analyzed(selected_symbol, timeframe=timeframe)
         
         if df is not None and not df.empty:
             # Charts
@@ -384,7 +354,12 @@ details > summary::-webkit-details-marker {
     with col2:
         if show_trades:
             st.subheader("การซื้อขายล่าสุด")
-            trades = bitkub.get_recent_trades(selected_symbol)
+            # Served from the recorder's archive when it tracks this symbol (no extra API call)
+            recorded = trade_recorder.archive.recent(selected_symbol, 15)
+            if not recorded.empty:
+                trades = [[t.timestamp, t.price, t.amount, "buy" if t.is_buy else "sell"] for t in recorded.itertuples()]
+            else:
+                trades = bitkub.get_recent_trades(selected_symbol)
             if trades:
                 # Format trade data
                 trade_data = []
@@ -396,6 +371,13 @@ details > summary::-webkit-details-marker {
                         "ประเภท": t[3].upper() # BUY/SELL
                     })
                 st.table(pd.DataFrame(trade_data))
+
+                # Tick-level stats from the archive (last hour)
+                ticks = trade_recorder.archive.scan(selected_symbol, int(time.time()) - 3600)
+                if not ticks.empty:
+                    hourly_vwap = vwap(ticks, 3600)['vwap'].iloc[-1]
+                    imbalance = trade_imbalance(ticks, 3600)['imbalance'].iloc[-1]
+                    st.caption(f"VWAP 1 ชม.: {hourly_vwap:,.2f} | แรงซื้อ-ขาย: {imbalance:+.2f}")
             else:
                 st.write("ไม่มีข้อมูลการซื้อขายล่าสุด")
         else:
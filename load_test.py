@@ -0,0 +1,150 @@
+
+import io
+import sys
+import time
+import random
+import argparse
+import threading
+import contextlib
+
+from services.bitkub_service import BitkubService
+from services.bitkub_simulator import BitkubSimulator, make_symbols
+from services.backfill_service import BackfillService
+from services.candle_feed import CandleFeed
+from services.screener_service import MarketScreener
+from services.background_monitor import BackgroundMonitor, DEFAULT_SYMBOLS
+from services.request_budget import RequestBudget, AdaptivePoller, ALERT, HISTORY, MARKET
+from utils.signal_rules import DEFAULT_RULESET
+
+
+class CountingLineService:
+    """
+    Stands in for LineMessagingService so alerts are counted instead of sent.
+    """
+    def __init__(self):
+        self.sent = 0
+
+    def send_message(self, message, retry_count=0):
+        self.sent += 1
+        return True
+
+
+def percentile(values, p):
+    if not values:
+        return float('nan')
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))]
+
+
+def run_viewer(bitkub, feed, screener, stop_at, think_time, latencies, lock):
+    """
+    One simulated dashboard session: re-render main() until stop_at.
+    """
+    rng = random.Random()
+    while time.time() < stop_at:
+        timeframe = rng.choice(["15m", "1h", "4h", "1D"])
+        selected = rng.choice(DEFAULT_SYMBOLS)
+        start = time.perf_counter()
+
+        frames = {sym: feed.get_analyzed(sym, timeframe=timeframe) for sym in DEFAULT_SYMBOLS}
+        DEFAULT_RULESET.evaluate_batch(frames)
+        screener.refresh_tickers(max_age=60)
+        screener.top('rsi', k=10, ascending=True)
+        bitkub.get_ticker(selected)
+        if rng.random() < 0.3:
+            bitkub.get_recent_trades(selected)
+
+        with lock:
+            latencies.append(time.perf_counter() - start)
+        time.sleep(think_time)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test BackgroundMonitor and dashboard sessions against the local Bitkub simulator")
+    parser.add_argument('--symbols', type=int, default=500)
+    parser.add_argument('--viewers', type=int, default=50)
+    parser.add_argument('--duration', type=float, default=60, help="seconds of concurrent load")
+    parser.add_argument('--think-time', type=float, default=1.0, help="pause between dashboard re-renders (s)")
+    parser.add_argument('--history-bars', type=int, default=300)
+    parser.add_argument('--max-age', type=float, default=0, help="feed refresh interval (0: every read hits the API)")
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--jitter', type=float, default=0.01)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--rate-limit', type=float, default=None)
+    parser.add_argument('--budget', type=float, default=None,
+                        help="client request budget per endpoint class (req/s, default: unlimited)")
+    parser.add_argument('--adaptive', action='store_true',
+                        help="let the monitor skip quiet symbols (default: refresh every symbol every cycle)")
+    parser.add_argument('--verbose', action='store_true', help="keep service debug output")
+    args = parser.parse_args()
+
+    sim = BitkubSimulator(symbols=make_symbols(args.symbols), latency=args.latency, jitter=args.jitter,
+                          error_rate=args.error_rate, rate_limit=args.rate_limit)
+    sim.start()
+    print(f"--- Load test: {args.symbols} symbols, {args.viewers} viewers, simulator {sim.url} ---")
+
+    limits = {HISTORY: (args.budget, args.budget), MARKET: (args.budget, args.budget)} if args.budget else {}
+    budget = RequestBudget(limits)
+    bitkub = BitkubService(base_url=sim.url, budget=budget)
+    backfill = BackfillService(bitkub, max_workers=8, requests_per_second=None, cache_dir=None)
+    feed = CandleFeed(bitkub, history_bars=args.history_bars, max_age=args.max_age, backfill=backfill)
+    screener = MarketScreener(bitkub)
+    line = CountingLineService()
+    poller = None if args.adaptive else AdaptivePoller(min_interval=0, max_interval=0)
+    monitor = BackgroundMonitor(line, feed, screener, symbols=make_symbols(args.symbols),
+                                budget=budget, poller=poller)
+
+    quiet = contextlib.nullcontext() if args.verbose else contextlib.redirect_stdout(io.StringIO())
+    cycles = []
+    latencies = []
+    lock = threading.Lock()
+
+    with quiet:
+        # Cold cycle: backfills every symbol
+        start = time.perf_counter()
+        with budget.priority(ALERT):
+            cold_symbols = monitor.run_cycle()
+        cold_time = time.perf_counter() - start
+
+        stop_at = time.time() + args.duration
+        viewers = [
+            threading.Thread(target=run_viewer, args=(bitkub, feed, screener, stop_at, args.think_time, latencies, lock), daemon=True)
+            for _ in range(args.viewers)
+        ]
+        for v in viewers:
+            v.start()
+
+        # Warm cycles run back to back while the viewers are active
+        while time.time() < stop_at:
+            start = time.perf_counter()
+            with budget.priority(ALERT):
+                n = monitor.run_cycle()
+            cycles.append((n, time.perf_counter() - start))
+
+        for v in viewers:
+            v.join()
+
+    sim.stop()
+
+    print(f"\n1. Cold monitor cycle (backfill): {cold_symbols} symbols in {cold_time:.1f}s "
+          f"({cold_symbols / cold_time:.1f} symbols/s)")
+    if cycles:
+        total_symbols = sum(n for n, _ in cycles)
+        total_time = sum(t for _, t in cycles)
+        cycle_times = [t for _, t in cycles]
+        print(f"2. Warm monitor cycles: {len(cycles)} cycles, {total_symbols / total_time:.1f} symbols/s, "
+              f"p50 {percentile(cycle_times, 50):.2f}s, max {max(cycle_times):.2f}s")
+    print(f"3. Dashboard renders: {len(latencies)} "
+          f"(p50 {percentile(latencies, 50) * 1000:.0f} ms, p95 {percentile(latencies, 95) * 1000:.0f} ms, "
+          f"p99 {percentile(latencies, 99) * 1000:.0f} ms, max {max(latencies, default=0) * 1000:.0f} ms)")
+    print(f"4. Alerts sent: {line.sent}")
+    print("5. Request budget:")
+    for (kind, key), value in sorted(budget.stats.items(), key=lambda item: str(item[0])):
+        print(f"   {kind} {key}: {value:.1f}" if kind == 'wait' else f"   {kind} {key}: {value}")
+    print("6. Simulator:")
+    for (kind, key), count in sorted(sim.stats.items(), key=lambda item: str(item[0])):
+        print(f"   {kind} {key}: {count}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
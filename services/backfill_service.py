@@ -0,0 +1,220 @@
+
+import os
+import time
+import threading
+import pandas as pd
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from services.bitkub_service import BitkubService, RES_MAP, TIMEFRAME_SECONDS
+from services.request_budget import BACKFILL
+
+CACHE_DIR = os.path.join("data", "backfill")
+CANDLE_COLUMNS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+
+def split_range(from_timestamp, to_timestamp, timeframe, bars_per_chunk=1000):
+    """
+    Cover [from, to] with consecutive (from, to) windows of bars_per_chunk bars.
+    Windows sit on a fixed grid (multiples of the chunk span since the epoch), so
+    any range maps onto the same chunk files and cached chunks are reused across
+    runs; the first and last window may extend past the requested range.
+    """
+    bar_seconds = TIMEFRAME_SECONDS[timeframe]
+    span = bar_seconds * bars_per_chunk
+    start = from_timestamp - (from_timestamp % span)
+
+    chunks = []
+    while start <= to_timestamp:
+        chunks.append((start, start + span - 1))
+        start += span
+    return chunks
+
+
+def find_gaps(df, timeframe):
+    """
+    Return a list of (last_timestamp_before_gap, first_timestamp_after_gap, missing_bars)
+    for every place where consecutive bars are more than one bar apart.
+    """
+    if df.empty or len(df) < 2:
+        return []
+
+    bar_seconds = TIMEFRAME_SECONDS[timeframe]
+    ts = df['timestamp'].to_numpy()
+    diffs = ts[1:] - ts[:-1]
+    gaps = []
+    for i in (diffs > bar_seconds).nonzero()[0]:
+        gaps.append((int(ts[i]), int(ts[i + 1]), int(diffs[i] // bar_seconds) - 1))
+    return gaps
+
+
+class RequestThrottle:
+    """
+    Simple shared pacing: at most `requests_per_second` calls are released
+    across all worker threads.
+    """
+    def __init__(self, requests_per_second=5):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0
+        self.lock = threading.Lock()
+        self.next_time = 0.0
+
+    def wait(self):
+        with self.lock:
+            now = time.monotonic()
+            delay = self.next_time - now
+            self.next_time = max(now, self.next_time) + self.interval
+        if delay > 0:
+            time.sleep(delay)
+
+
+class BackfillService:
+    """
+    Chunked, concurrent historical downloader on top of BitkubService.get_history.
+
+    Completed chunks are written to CACHE_DIR/<symbol>/<timeframe>/<from>_<to>.csv,
+    so an interrupted backfill resumes by skipping chunks that already exist
+    (pass cache_dir=None to disable).
+    The chunk that reaches "now" is never cached because it is still forming.
+    Requests go out at BACKFILL priority unless the caller passes one or the
+    calling thread set one (e.g. the alert monitor backfilling a symbol it needs
+    right now).
+    """
+    def __init__(self, bitkub=None, max_workers=4, requests_per_second=5,
+                 bars_per_chunk=1000, max_retries=3, cache_dir=CACHE_DIR):
+        self.bitkub = bitkub or BitkubService()
+        self.max_workers = max_workers
+        self.throttle = RequestThrottle(requests_per_second)
+        self.bars_per_chunk = bars_per_chunk
+        self.max_retries = max_retries
+        self.cache_dir = cache_dir
+
+    def _chunk_path(self, symbol, timeframe, chunk):
+        return os.path.join(self.cache_dir, symbol, timeframe, f"{chunk[0]}_{chunk[1]}.csv")
+
+    def _load_chunk(self, path):
+        try:
+            return pd.read_csv(path)
+        except Exception as e:
+            print(f"Backfill: unreadable chunk {path} ({e}), refetching")
+            return None
+
+    def _fetch_chunk(self, symbol, timeframe, chunk, priority=BACKFILL):
+        """
+        Download one chunk with retries; returns (chunk, DataFrame).
+        """
+        path = self._chunk_path(symbol, timeframe, chunk) if self.cache_dir else None
+        if path and os.path.exists(path):
+            df = self._load_chunk(path)
+            if df is not None:
+                return chunk, df
+
+        resolution = RES_MAP[timeframe]
+        for attempt in range(self.max_retries):
+            self.throttle.wait()
+            try:
+                df = self.bitkub.get_history(symbol, resolution, chunk[0], chunk[1], verbose=False, priority=priority)
+                break
+            except Exception as e:
+                print(f"Backfill: {symbol} {timeframe} {chunk} attempt {attempt + 1} failed: {e}")
+                time.sleep(2 ** attempt)
+        else:
+            return chunk, None
+
+        status = df.attrs.get('status')
+        if df.empty:
+            df = pd.DataFrame(columns=CANDLE_COLUMNS)
+        else:
+            df = df[CANDLE_COLUMNS]
+
+        # Only persist closed chunks (the newest one is still receiving bars), and only
+        # answers with status 'ok': 'no_data' / errors are retried on the next run
+        if path and status == 'ok' and chunk[1] + TIMEFRAME_SECONDS[timeframe] < time.time():
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + ".tmp"
+            df.to_csv(tmp_path, index=False)
+            os.replace(tmp_path, path)
+
+        return chunk, df
+
+    def load_cached(self, symbol, timeframe, from_timestamp, to_timestamp):
+        """
+        Stitch [from, to] from chunk files already on disk (never calls the API).
+        """
+        if not self.cache_dir:
+            return pd.DataFrame(columns=CANDLE_COLUMNS)
+        directory = os.path.join(self.cache_dir, symbol, timeframe)
+        parts = []
+        if os.path.isdir(directory):
+            for name in sorted(os.listdir(directory)):
+                if not name.endswith('.csv'):
+                    continue
+                try:
+                    start, end = (int(x) for x in name[:-4].split('_'))
+                except ValueError:
+                    continue
+                if end >= from_timestamp and start <= to_timestamp:
+                    df = self._load_chunk(os.path.join(directory, name))
+                    if df is not None and not df.empty:
+                        parts.append(df)
+        return self._stitch(parts, timeframe, from_timestamp, to_timestamp, [])
+
+    def backfill(self, symbol, timeframe, from_timestamp, to_timestamp=None, priority=None):
+        """
+        Download [from, to] for one symbol and return a single stitched DataFrame
+        (same columns as BitkubService.get_candles). Gaps are reported in df.attrs['gaps'],
+        chunks that failed all retries in df.attrs['failed_chunks'].
+        """
+        result = self.backfill_many([symbol], timeframe, from_timestamp, to_timestamp, priority)
+        return result[symbol]
+
+    def backfill_many(self, symbols, timeframe, from_timestamp, to_timestamp=None, priority=None):
+        """
+        Backfill several symbols at once, sharing one worker pool and request budget.
+        returns: dict of symbol -> stitched DataFrame
+        """
+        if timeframe not in RES_MAP:
+            raise ValueError(f"Unsupported timeframe: {timeframe}")
+        if to_timestamp is None:
+            to_timestamp = int(time.time())
+
+        chunks = split_range(from_timestamp, to_timestamp, timeframe, self.bars_per_chunk)
+        # Worker threads do not inherit the caller's priority context, so pass it on
+        if priority is None:
+            priority = self.bitkub.budget.current_priority(default=BACKFILL)
+        parts = {sym: [] for sym in symbols}
+        failed = {sym: [] for sym in symbols}
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {
+                executor.submit(self._fetch_chunk, sym, timeframe, chunk, priority): sym
+                for sym in symbols for chunk in chunks
+            }
+            for future in as_completed(futures):
+                sym = futures[future]
+                chunk, df = future.result()
+                if df is None:
+                    failed[sym].append(chunk)
+                elif not df.empty:
+                    parts[sym].append(df)
+
+        return {
+            sym: self._stitch(parts[sym], timeframe, from_timestamp, to_timestamp, failed[sym])
+            for sym in symbols
+        }
+
+    def _stitch(self, parts, timeframe, from_timestamp, to_timestamp, failed_chunks):
+        if parts:
+            df = pd.concat(parts, ignore_index=True)
+        else:
+            df = pd.DataFrame(columns=CANDLE_COLUMNS)
+
+        df = df[(df['timestamp'] >= from_timestamp) & (df['timestamp'] <= to_timestamp)]
+        # The API may return the boundary bar in two adjacent chunks; keep one copy
+        df = df.drop_duplicates(subset='timestamp', keep='last')
+        df = df.sort_values('timestamp').reset_index(drop=True)
+        df['timestamp'] = df['timestamp'].astype('int64')
+        df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
+
+        df.attrs['gaps'] = find_gaps(df, timeframe)
+        df.attrs['failed_chunks'] = sorted(failed_chunks)
+        if failed_chunks:
+            print(f"Backfill: {len(failed_chunks)} chunk(s) failed, re-run to resume")
+        return df
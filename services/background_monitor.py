@@ -0,0 +1,200 @@
+
+import time
+import threading
+from datetime import datetime
+from utils.signal_rules import DEFAULT_RULESET, BUY, SELL, summarize_direction
+from services.bitkub_service import TIMEFRAME_SECONDS
+from services.request_budget import DEFAULT_BUDGET, ALERT, BACKFILL, AdaptivePoller
+from utils.correlation import CorrelationEngine
+
+DEFAULT_SYMBOLS = ['BTC_THB', 'ETH_THB', 'SCRT_THB', 'POW_THB', 'SPEC_THB']
+
+# Screener EMA200 cross events -> alert text
+EMA200_EVENT_TEXT = {
+    'cross_above_ema200': "🟢 ราคาตัดขึ้นเหนือ EMA200",
+    'cross_below_ema200': "🔴 ราคาตัดลงต่ำกว่า EMA200"
+}
+
+class BackgroundMonitor:
+    def __init__(self, line_service, candle_feed, screener, symbols=None, timeframe="1h", interval=60,
+                 budget=None, poller=None):
+        self.line_service = line_service
+        self.candle_feed = candle_feed
+        self.screener = screener
+        self.is_running = False
+        self.last_alert_dict = {} # Thread-safe alert history
+        self.symbols = symbols or DEFAULT_SYMBOLS
+        self.timeframe = timeframe # Default Timeframe 1h for background monitoring
+        self.interval = interval # Seconds between cycles
+        self.thread = None
+        self.last_hourly_report_time = time.time()
+        self.last_event_seq = 0 # Screener events already alerted
+        self.budget = budget or DEFAULT_BUDGET
+        # Every symbol is re-fetched every cycle; only while the request budget is
+        # under pressure do quiet symbols back off (up to every 10 cycles)
+        self.poller = poller or AdaptivePoller(min_interval=interval, max_interval=10 * interval, budget=self.budget)
+        # Rolling correlation / beta vs BTC across the watchlist (BTC_CORR / BTC_BETA columns)
+        self.correlation = CorrelationEngine(self.symbols)
+        self.market_thread = None # Market-wide screener refresh, off the alert path
+
+    def start(self):
+        if not self.is_running:
+            self.is_running = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            print("Background Monitor Started!")
+
+    def _format_single_message(self, sym, last_price, percent_change, sigs, btc_corr=None, btc_beta=None):
+        # Determine Action
+        action = {
+            BUY: "ซื้อ",
+            SELL: "ขาย",
+            'mixed': "ระมัดระวัง (Mixed)"
+        }.get(summarize_direction(sigs), "เฝ้าระวัง")
+            
+        # Format Message
+        short_sym = sym.replace("_THB", "")
+        change_sign = "+" if percent_change >= 0 else ""
+        
+        msg = f"🪙 {short_sym}: {last_price:,.2f} ({change_sign}{percent_change:.2f}%)\n"
+        msg += f" - analyze : {action}\n"
+        # How much of the move is just BTC moving
+        if sym != self.correlation.benchmark and btc_corr is not None and btc_corr == btc_corr:
+            msg += f" - สัมพันธ์กับ BTC : corr {btc_corr:.2f} / beta {btc_beta:.2f}\n"
+        
+        # Format specific alerts
+        for s in sigs:
+            icon = {BUY: "🟢", SELL: "🔴"}.get(s.direction, "🔸")
+            msg += f"  {icon} **แจ้งเตือน: {s.message}**\n"
+        
+        return msg
+
+    def run_cycle(self):
+        """
+        One monitoring pass over all symbols: fetch, evaluate rules, send alerts.
+        returns: number of symbols that produced data
+        """
+        messages = []
+        hourly_messages = []
+        pending_updates = {}
+        current_time = time.time()
+        is_hourly_report = (current_time - self.last_hourly_report_time) >= 3600
+        timeframe = self.timeframe
+        frames = {}
+        due = set(self.poller.due(self.symbols, current_time))
+
+        # Fetch all tickers once (% change for every symbol + screener rankings)
+        self.screener.refresh_tickers()
+
+        # 1. Loop through symbols
+        for sym in self.symbols:
+            try:
+                # Fetch Candles for Signals (symbols not due yet reuse the in-memory bars)
+                df = self.candle_feed.get_analyzed(sym, timeframe=timeframe, refresh=sym in due)
+
+                if not df.empty:
+                    frames[sym] = df
+                    if sym in due:
+                        self.poller.observe(sym, df['close'], TIMEFRAME_SECONDS[timeframe], current_time)
+                    if timeframe == self.screener.timeframe:
+                        self.screener.update_frame(sym, df)
+
+            except Exception as e:
+                print(f"Bg Error {sym}: {e}")
+
+        # Commit newly closed bars to the correlation engine, expose results to the rules
+        self.correlation.sync(frames)
+        self.correlation.annotate(frames)
+
+        # Evaluate all rules for all symbols in one batch
+        signals_by_symbol = DEFAULT_RULESET.evaluate_batch(frames)
+
+        for sym, df in frames.items():
+            sigs = signals_by_symbol[sym]
+
+            # Generate Message using Helper (Always needed for hourly or alerts)
+            last_price = df['close'].iloc[-1]
+            percent_change = self.screener.value('percent_change', sym, 0.0)
+            msg = self._format_single_message(sym, last_price, percent_change, sigs,
+                                              df['BTC_CORR'].iloc[-1], df['BTC_BETA'].iloc[-1])
+
+            # Logic A: Signal Alert (Only if signals exist and new state)
+            if sigs:
+                state_key = f"{sym}_{timeframe}_{df['timestamp'].iloc[-1]}"
+                if self.last_alert_dict.get(sym) != state_key:
+                    messages.append(msg)
+                    pending_updates[sym] = state_key
+
+            # Logic B: Hourly Report (Force Send regardless of signals)
+            if is_hourly_report:
+                hourly_messages.append(msg)
+
+        # Screener as an alert source: symbols that just crossed EMA200
+        events = self.screener.events_since(self.last_event_seq)
+        if events:
+            lines = [f"🪙 {e['symbol'].replace('_THB', '')}: {EMA200_EVENT_TEXT[e['event']]} ({e['close']:,.2f})" for e in events]
+            messages.append("📡 Screener\n" + "\n".join(lines) + "\n")
+            pending_event_seq = events[-1]['seq']
+        else:
+            pending_event_seq = self.last_event_seq
+
+        # 2. Send Signal Alerts (Priority)
+        if messages and self.line_service:
+            full_msg = "🔔 สรุปราคา Crypto (Signal)\n\n" + "\n".join(messages)
+            if self.line_service.send_message(full_msg):
+                print(f"Sent Batch Alert: {len(messages)} symbols")
+                self.last_alert_dict.update(pending_updates)
+                self.last_event_seq = pending_event_seq
+
+        # 3. Send Hourly Report (Heartbeat) - Restricted to 06:00 - 22:00
+        current_hour = datetime.now().hour
+        is_active_hours = 6 <= current_hour < 22 # 06:00 to 21:59
+
+        if is_hourly_report and hourly_messages and self.line_service and is_active_hours:
+            full_msg = "🕒 รายงานสถานะรายชั่วโมง\n\n" + "\n".join(hourly_messages)
+            if self.line_service.send_message(full_msg):
+                print(f"Sent Hourly Report: {len(hourly_messages)} symbols")
+                self.last_hourly_report_time = current_time
+        elif is_hourly_report:
+            # Reset the timer even if we suppressed the message due to hours or no service
+            if is_hourly_report:
+                if not is_active_hours:
+                    print(f"Hourly Report Suppressed (Hour: {current_hour})")
+                self.last_hourly_report_time = current_time
+
+        # Rank the rest of the market too (its crosses are alerted next cycle)
+        self._refresh_market()
+
+        return len(frames)
+
+    def _refresh_market(self):
+        """
+        Update screener rankings for a batch of the stalest pairs in a separate
+        thread: those requests run at BACKFILL priority and may wait a long time
+        for the request budget, which must never hold up an alert.
+        """
+        if self.timeframe != self.screener.timeframe:
+            return
+        if self.market_thread is not None and self.market_thread.is_alive():
+            return
+        self.market_thread = threading.Thread(target=self._refresh_market_batch, daemon=True)
+        self.market_thread.start()
+
+    def _refresh_market_batch(self):
+        try:
+            with self.budget.priority(BACKFILL):
+                self.screener.refresh_indicators()
+        except Exception as e:
+            print(f"Screener refresh error: {e}")
+
+    def _run(self):
+        while self.is_running:
+            try:
+                # Alert-critical: served before dashboard and backfill requests
+                with self.budget.priority(ALERT):
+                    self.run_cycle()
+                time.sleep(self.interval)
+                
+            except Exception as e:
+                print(f"Background Loop Error: {e}")
+                time.sleep(self.interval)
@@ -1,23 +1,64 @@
 
+import os
 import requests
 import pandas as pd
 import time
 from datetime import datetime, timedelta
+from services.request_budget import DEFAULT_BUDGET, HISTORY, MARKET
 
-BASE_URL = "https://api.bitkub.com"
+# BITKUB_BASE_URL points the client at another server (e.g. the local simulator)
+BASE_URL = os.environ.get("BITKUB_BASE_URL", "https://api.bitkub.com")
+
+# Timeframe -> /tradingview/history resolution
+RES_MAP = {
+    '1m': '1',
+    '5m': '5',
+    '15m': '15',
+    '1h': '60',
+    '4h': '240',
+    '1D': '1D'
+}
+
+# Timeframe -> bar length in seconds
+TIMEFRAME_SECONDS = {
+    '1m': 60,
+    '5m': 5 * 60,
+    '15m': 15 * 60,
+    '1h': 60 * 60,
+    '4h': 4 * 60 * 60,
+    '1D': 24 * 60 * 60
+}
 
 class BitkubService:
-    def __init__(self):
-        self.base_url = BASE_URL
+    def __init__(self, base_url=None, budget=None):
+        self.base_url = base_url or BASE_URL
+        # Shared request budget: every instance draws from the same token buckets
+        self.budget = budget or DEFAULT_BUDGET
 
-    def get_symbols(self):
+    def _get(self, url, endpoint_class, priority=None, **kwargs):
+        """
+        requests.get behind the request budget. priority None uses the calling
+        thread's priority context (see RequestBudget.priority).
+        A 429 pauses the endpoint class for Retry-After seconds.
+        """
+        self.budget.acquire(endpoint_class, priority)
+        response = requests.get(url, **kwargs)
+        if response.status_code == 429:
+            try:
+                retry_after = float(response.headers.get('Retry-After', 1))
+            except ValueError:
+                retry_after = 1.0
+            self.budget.penalize(endpoint_class, retry_after)
+        return response
+
+    def get_symbols(self, priority=None):
         """
         Fetch all available symbols from Bitkub
         returns: list of dictionaries containing symbol info
         """
         try:
             url = f"{self.base_url}/api/v3/market/symbols"
-            response = requests.get(url)
+            response = self._get(url, MARKET, priority)
             response.raise_for_status()
             data = response.json()
             if data['error'] == 0:
@@ -29,7 +70,7 @@ class BitkubService:
             print(f"Exception fetching symbols: {e}")
             return []
 
-    def get_ticker(self, symbol=None):
+    def get_ticker(self, symbol=None, priority=None):
         """
         Fetch ticker data.
         If symbol is provided, returns ticker for that symbol.
@@ -41,14 +82,14 @@ class BitkubService:
             if symbol:
                 params['sym'] = symbol
             
-            response = requests.get(url, params=params)
+            response = self._get(url, MARKET, priority, params=params)
             response.raise_for_status()
             return response.json()
         except Exception as e:
             print(f"Exception fetching ticker: {e}")
             return None
 
-    def get_recent_trades(self, symbol, limit=20):
+    def get_recent_trades(self, symbol, limit=20, priority=None):
         """
         Fetch recent trades for a symbol
         """
@@ -58,7 +99,7 @@ class BitkubService:
                 'sym': symbol,
                 'lmt': limit
             }
-            response = requests.get(url, params=params)
+            response = self._get(url, MARKET, priority, params=params)
             response.raise_for_status()
             data = response.json()
             if data['error'] == 0:
@@ -69,7 +110,7 @@ class BitkubService:
             print(f"Exception fetching trades: {e}")
             return []
 
-    def get_candles(self, symbol, timeframe='1D', limit=100, start_timestamp=None, end_timestamp=None):
+    def get_candles(self, symbol, timeframe='1D', limit=100, start_timestamp=None, end_timestamp=None, priority=None):
         """
         Fetch historical candle data (OHLC) for charting
         timeframe: '1D', '1H', etc. needs mapping to resolution seconds or string for API
@@ -80,71 +121,71 @@ class BitkubService:
         to: timestamp
         """
         try:
-            # Resolution mapping
-            res_map = {
-                '1m': '1',
-                '5m': '5',
-                '15m': '15',
-                '1h': '60',
-                '4h': '240',
-                '1D': '1D'
-            }
-            resolution = res_map.get(timeframe, '1D')
+            resolution = RES_MAP.get(timeframe, '1D')
             
             # Calculate from/to timestamps
             if start_timestamp and end_timestamp:
                 from_timestamp = start_timestamp
                 to_timestamp = end_timestamp
             else:
-                # For 1D, fetch enough data for indicators (e.g. 200 days for EMA200)
+                # Fetch enough bars for indicators (e.g. 200 bars for EMA200) + limit,
+                # sized by the bar length of the requested timeframe
                 now = datetime.now()
-                
-                # Default to fetching enough data for EMA200 + buffer
-                # If timeframe is minutes, we need less days but enough candles
-                if timeframe == '1D':
-                    start_time = now - timedelta(days=limit + 200) 
-                elif timeframe == '1h':
-                    start_time = now - timedelta(hours=limit + 200)
-                else:
-                     start_time = now - timedelta(days=30) # Default fallback
+                bar_seconds = TIMEFRAME_SECONDS.get(timeframe, TIMEFRAME_SECONDS['1D'])
+                start_time = now - timedelta(seconds=bar_seconds * (limit + 200))
 
                 to_timestamp = int(now.timestamp())
                 from_timestamp = int(start_time.timestamp())
 
-            url = f"{self.base_url}/tradingview/history"
-            params = {
-                'symbol': symbol,
-                'resolution': resolution,
-                'from': from_timestamp,
-                'to': to_timestamp
-            }
-            
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
-            }
-            
-            response = requests.get(url, params=params, headers=headers)
-            print(f"Debug: Requesting {response.url}")
-            response.raise_for_status()
-            data = response.json()
-            
-            if data['s'] == 'ok':
-                df = pd.DataFrame({
-                    'timestamp': data['t'],
-                    'open': data['o'],
-                    'high': data['h'],
-                    'low': data['l'],
-                    'close': data['c'],
-                    'volume': data['v']
-                })
-                # Convert timestamp to datetime
-                df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
-                return df
-            else:
-                print(f"Debug: API returned status '{data.get('s')}' for {symbol}")
-                print(f"Debug: Full response: {data}")
-                return pd.DataFrame() # Return empty if no data or error
+            return self.get_history(symbol, resolution, from_timestamp, to_timestamp, priority=priority)
                 
         except Exception as e:
             print(f"Exception fetching candles: {e}")
             return pd.DataFrame()
+
+    def get_history(self, symbol, resolution, from_timestamp, to_timestamp, verbose=True, priority=None):
+        """
+        Single request to /tradingview/history for an explicit [from, to] window.
+        resolution: API resolution string (see RES_MAP)
+        Raises on HTTP errors so callers (e.g. backfill) can retry.
+        The API status ('ok', 'no_data', 'error') is kept in df.attrs['status'].
+        """
+        url = f"{self.base_url}/tradingview/history"
+        params = {
+            'symbol': symbol,
+            'resolution': resolution,
+            'from': from_timestamp,
+            'to': to_timestamp
+        }
+        
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+        }
+        
+        response = self._get(url, HISTORY, priority, params=params, headers=headers)
+        if verbose:
+            print(f"Debug: Requesting {response.url}")
+        response.raise_for_status()
+        data = response.json()
+        
+        if data['s'] == 'ok':
+            df = pd.DataFrame({
+                'timestamp': data['t'],
+                'open': data['o'],
+                'high': data['h'],
+                'low': data['l'],
+                'close': data['c'],
+                'volume': data['v']
+            })
+            # Convert timestamp to datetime
+            df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
+            df.attrs['status'] = 'ok'
+            return df
+        else:
+            if verbose:
+                print(f"Debug: API returned status '{data.get('s')}' for {symbol}")
+                print(f"Debug: Full response: {data}")
+            df = pd.DataFrame() # Return empty if no data or error
+            df.attrs['status'] = data.get('s')
+            return df
+            
@@ -0,0 +1,297 @@
+
+import os
+import json
+import time
+import random
+import argparse
+import threading
+import numpy as np
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+# /tradingview/history resolution -> seconds
+RESOLUTION_SECONDS = {
+    '1': 60,
+    '5': 5 * 60,
+    '15': 15 * 60,
+    '60': 60 * 60,
+    '240': 4 * 60 * 60,
+    '1D': 24 * 60 * 60
+}
+
+DEFAULT_SYMBOLS = ['BTC_THB', 'ETH_THB', 'SCRT_THB', 'POW_THB', 'SPEC_THB']
+
+
+def make_symbols(count):
+    """
+    The real watchlist followed by synthetic SIMnnn_THB pairs up to `count` symbols.
+    """
+    symbols = DEFAULT_SYMBOLS[:count]
+    symbols += [f"SIM{i:03d}_THB" for i in range(count - len(symbols))]
+    return symbols
+
+
+def _noise(ticks, seed):
+    """
+    Deterministic pseudo-random values in [-0.5, 0.5) for integer ticks,
+    so any [from, to] range of the same symbol is consistent across requests.
+    """
+    x = (np.asarray(ticks, dtype=np.uint64) * np.uint64(2654435761) + np.uint64(seed)) % np.uint64(2 ** 32)
+    x = (x ^ (x >> np.uint64(13))) * np.uint64(1274126177) % np.uint64(2 ** 32)
+    return x.astype(np.float64) / 2 ** 32 - 0.5
+
+
+class SyntheticMarket:
+    """
+    Deterministic synthetic prices: a few slow waves plus per-minute noise per symbol.
+    """
+    def __init__(self, symbols):
+        self.symbols = list(symbols)
+        self.params = {}
+        for sym in self.symbols:
+            rng = random.Random(sym)
+            self.params[sym] = {
+                'seed': rng.randrange(2 ** 32),
+                'base': 10 ** rng.uniform(-1, 6),
+                'phases': [rng.uniform(0, 2 * np.pi) for _ in range(3)],
+                'volume': 10 ** rng.uniform(2, 6)
+            }
+
+    def price(self, sym, timestamps):
+        p = self.params[sym]
+        t = np.asarray(timestamps, dtype=np.float64)
+        wave = (0.15 * np.sin(2 * np.pi * t / (90 * 86400) + p['phases'][0])
+                + 0.05 * np.sin(2 * np.pi * t / (7 * 86400) + p['phases'][1])
+                + 0.01 * np.sin(2 * np.pi * t / 3600 + p['phases'][2]))
+        return p['base'] * np.exp(wave + 0.004 * _noise(np.asarray(timestamps) // 60, p['seed']))
+
+    def history(self, sym, resolution, from_ts, to_ts):
+        step = RESOLUTION_SECONDS[resolution]
+        now = int(time.time())
+        start = from_ts - from_ts % step
+        ts = np.arange(start, min(to_ts, now) + 1, step, dtype=np.int64)
+        if not len(ts):
+            return None
+        seed = self.params[sym]['seed']
+        opens = self.price(sym, ts)
+        closes = self.price(sym, np.minimum(ts + step, now))
+        spread = 1 + 0.003 * np.abs(_noise(ts // step, seed + 1)) * np.sqrt(step / 60)
+        return {
+            't': ts.tolist(),
+            'o': opens.tolist(),
+            'h': (np.maximum(opens, closes) * spread).tolist(),
+            'l': (np.minimum(opens, closes) / spread).tolist(),
+            'c': closes.tolist(),
+            'v': (self.params[sym]['volume'] * step / 86400 * (1 + _noise(ts // step, seed + 2))).tolist()
+        }
+
+    def ticker(self, sym):
+        now = int(time.time())
+        last, prev = self.price(sym, [now, now - 86400])
+        return {
+            'symbol': sym,
+            'last': float(last),
+            'percent_change': float((last - prev) / prev * 100),
+            'base_volume': self.params[sym]['volume'] / last,
+            'quote_volume': self.params[sym]['volume'],
+            'high_24_hr': float(max(last, prev) * 1.02),
+            'low_24_hr': float(min(last, prev) * 0.98)
+        }
+
+    def trades(self, sym, limit):
+        now = int(time.time())
+        ts = now - np.arange(limit) * 3
+        prices = self.price(sym, ts)
+        seed = self.params[sym]['seed']
+        amounts = np.abs(_noise(ts, seed + 3)) * 2
+        sides = np.where(_noise(ts, seed + 4) > 0, 'BUY', 'SELL')
+        return [[int(t), float(p), float(a), str(s)] for t, p, a, s in zip(ts, prices, amounts, sides)]
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+
+class BitkubSimulator:
+    """
+    Local stand-in for the public Bitkub endpoints used by BitkubService:
+    /api/v3/market/symbols, /ticker, /trades and /tradingview/history.
+
+    latency: fixed delay per request (seconds); jitter: mean of an extra
+    exponential delay (gives a realistic tail); error_rate: fraction of
+    requests answered with HTTP 500; rate_limit / burst: token bucket,
+    requests over budget get HTTP 429 with Retry-After.
+    record_dir: optional directory of recorded /tradingview/history responses
+    named <symbol>_<resolution>.json, served instead of synthetic candles.
+    """
+    def __init__(self, host='127.0.0.1', port=0, symbols=None, latency=0.0, jitter=0.0,
+                 error_rate=0.0, rate_limit=None, burst=None, record_dir=None, seed=None):
+        self.market = SyntheticMarket(symbols or DEFAULT_SYMBOLS)
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.bucket = TokenBucket(rate_limit, burst or rate_limit) if rate_limit else None
+        self.record_dir = record_dir
+        self.recorded = {}
+        self.random = random.Random(seed)
+        self.stats = Counter()
+        self.stats_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def count(self, key):
+        with self.stats_lock:
+            self.stats[key] += 1
+
+    def _recorded_history(self, sym, resolution, from_ts, to_ts):
+        key = (sym, resolution)
+        if key not in self.recorded:
+            path = os.path.join(self.record_dir, f"{sym}_{resolution}.json")
+            self.recorded[key] = None
+            if os.path.exists(path):
+                with open(path) as f:
+                    self.recorded[key] = json.load(f)
+        data = self.recorded[key]
+        if not data:
+            return None
+        keep = [i for i, t in enumerate(data['t']) if from_ts <= t <= to_ts]
+        if not keep:
+            return None
+        return {k: [data[k][i] for i in keep] for k in ('t', 'o', 'h', 'l', 'c', 'v')}
+
+    def route(self, path, query):
+        """
+        returns: (status, JSON-serializable body)
+        """
+        arg = lambda name, default=None: query.get(name, [default])[0]
+        symbols = self.market.symbols
+
+        if path == '/api/v3/market/symbols':
+            return 200, {'error': 0, 'result': [
+                {'symbol': s, 'base_asset': s.split('_')[0], 'quote_asset': 'THB', 'status': 'active'}
+                for s in symbols
+            ]}
+
+        if path == '/api/v3/market/ticker':
+            sym = arg('sym')
+            if sym:
+                return 200, [self.market.ticker(sym)] if sym in self.market.params else []
+            return 200, [self.market.ticker(s) for s in symbols]
+
+        if path == '/api/v3/market/trades':
+            sym = arg('sym')
+            if sym not in self.market.params:
+                return 200, {'error': 11, 'result': []}
+            return 200, {'error': 0, 'result': self.market.trades(sym, min(int(arg('lmt', 20)), 1000))}
+
+        if path == '/tradingview/history':
+            sym, resolution = arg('symbol'), arg('resolution')
+            if sym not in self.market.params or resolution not in RESOLUTION_SECONDS:
+                return 200, {'s': 'error', 'errmsg': 'unknown symbol or resolution'}
+            from_ts, to_ts = int(arg('from', 0)), int(arg('to', time.time()))
+            data = None
+            if self.record_dir:
+                data = self._recorded_history(sym, resolution, from_ts, to_ts)
+            if data is None:
+                data = self.market.history(sym, resolution, from_ts, to_ts)
+            if data is None:
+                return 200, {'s': 'no_data'}
+            return 200, dict(data, s='ok')
+
+        return 404, {'error': 404, 'message': 'not found'}
+
+    def _handler_class(self):
+        sim = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                sim.count(('requests', url.path))
+
+                delay = sim.latency + (sim.random.expovariate(1 / sim.jitter) if sim.jitter else 0)
+                if delay:
+                    time.sleep(delay)
+
+                if sim.bucket and not sim.bucket.take():
+                    sim.count(('status', 429))
+                    return self._send(429, {'error': 429, 'message': 'Too Many Requests'}, {'Retry-After': '1'})
+                if sim.error_rate and sim.random.random() < sim.error_rate:
+                    sim.count(('status', 500))
+                    return self._send(500, {'error': 500, 'message': 'Injected error'})
+
+                status, body = sim.route(url.path, parse_qs(url.query))
+                sim.count(('status', status))
+                self._send(status, body)
+
+            def _send(self, status, body, headers=None):
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(payload)))
+                for key, value in (headers or {}).items():
+                    self.send_header(key, value)
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass  # keep load tests quiet
+
+        return Handler
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local Bitkub API simulator")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--symbols', type=int, default=len(DEFAULT_SYMBOLS), help="number of THB pairs")
+    parser.add_argument('--latency', type=float, default=0.0, help="fixed delay per request (s)")
+    parser.add_argument('--jitter', type=float, default=0.0, help="mean extra exponential delay (s)")
+    parser.add_argument('--error-rate', type=float, default=0.0, help="fraction of HTTP 500 responses")
+    parser.add_argument('--rate-limit', type=float, default=None, help="requests per second before 429")
+    parser.add_argument('--burst', type=float, default=None)
+    parser.add_argument('--record-dir', default=None, help="recorded <symbol>_<resolution>.json history")
+    args = parser.parse_args()
+
+    sim = BitkubSimulator(args.host, args.port, make_symbols(args.symbols), args.latency, args.jitter,
+                          args.error_rate, args.rate_limit, args.burst, args.record_dir)
+    print(f"Bitkub simulator on {sim.url} ({args.symbols} symbols)")
+    print(f"Use it with: BITKUB_BASE_URL={sim.url} streamlit run app.py")
+    try:
+        sim.server.serve_forever()
+    except KeyboardInterrupt:
+        sim.stop()
+
+
+if __name__ == "__main__":
+    main()
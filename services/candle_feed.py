@@ -0,0 +1,182 @@
+
+import time
+import threading
+import pandas as pd
+from services.bitkub_service import BitkubService, TIMEFRAME_SECONDS
+from services.backfill_service import BackfillService
+from utils.resample import CandleResampler
+from utils.ring_buffer import OHLCV_COLUMNS
+from utils.indicators import calculate_indicators, INDICATOR_COLUMNS
+
+
+class CandleFeed:
+    """
+    One API feed per symbol: a base series (15m by default) is backfilled once,
+    then only new base bars are fetched, and 1h / 4h / 1D are derived locally.
+    Shared by the dashboard and the background monitor.
+
+    Candles and indicator columns live in preallocated ring buffers
+    (history_bars rows per timeframe); DataFrames are only built on request.
+    """
+    def __init__(self, bitkub=None, base_timeframe='15m', timeframes=('15m', '1h', '4h', '1D'),
+                 history_bars=300, max_age=60, backfill=None):
+        self.bitkub = bitkub or BitkubService()
+        self.backfill = backfill or BackfillService(self.bitkub)
+        self.base_timeframe = base_timeframe
+        self.timeframes = list(timeframes)
+        self.history_bars = history_bars  # bars kept per timeframe (EMA200 + display)
+        self.max_age = max_age  # seconds before a symbol is refreshed again
+        self.resamplers = {}
+        self.last_refresh = {}
+        self.analyzed = {}  # (symbol, timeframe) -> buffer version the indicators were computed for
+        self.lock = threading.Lock()
+        self.symbol_locks = {}
+        self.inflight = {}  # symbol -> (priority, Event) of the fetch in progress
+
+        # Initial backfill must cover history_bars bars of the largest timeframe
+        largest = max(TIMEFRAME_SECONDS[tf] for tf in self.timeframes)
+        self.history_seconds = largest * history_bars
+
+    def _symbol_lock(self, symbol):
+        with self.lock:
+            if symbol not in self.symbol_locks:
+                self.symbol_locks[symbol] = threading.Lock()
+            return self.symbol_locks[symbol]
+
+    def refresh(self, symbol, force=False):
+        """
+        Bring the base series of `symbol` up to date (backfill on first use,
+        incremental fetch afterwards).
+
+        The fetch runs without holding the symbol lock, so a caller never waits
+        on the request budget behind a lower-priority request. A caller joins an
+        in-flight fetch of the same or higher priority instead of duplicating it;
+        every request of a fetch (backfill included) goes out at the priority it
+        was registered with.
+        """
+        priority = self.bitkub.budget.current_priority()
+        with self._symbol_lock(symbol):
+            now = time.time()
+            if not force and now - self.last_refresh.get(symbol, 0) < self.max_age:
+                return
+            inflight = self.inflight.get(symbol)
+            if inflight and inflight[0] <= priority:
+                done = inflight[1]
+            else:
+                done = None
+                event = threading.Event()
+                self.inflight[symbol] = (priority, event)
+            resampler = self.resamplers.get(symbol)
+            since = resampler.last_timestamp if resampler is not None else None
+
+        if done is not None:
+            done.wait()
+            return
+
+        try:
+            if since is None:
+                new_bars = self.backfill.backfill(symbol, self.base_timeframe, int(now) - self.history_seconds,
+                                                  int(now), priority=priority)
+            else:
+                # Re-request the last stored bar as well, it was probably still forming
+                new_bars = self.bitkub.get_candles(symbol, timeframe=self.base_timeframe,
+                                                   start_timestamp=since, end_timestamp=int(now), priority=priority)
+
+            with self._symbol_lock(symbol):
+                resampler = self.resamplers.get(symbol)
+                if resampler is None or resampler.last_timestamp is None:
+                    resampler = CandleResampler(self.base_timeframe, self.timeframes, self.history_bars,
+                                                OHLCV_COLUMNS + INDICATOR_COLUMNS)
+                # Bars older than what a concurrent fetch already stored are ignored
+                resampler.update(new_bars)
+                self.resamplers[symbol] = resampler
+                self.last_refresh[symbol] = max(now, self.last_refresh.get(symbol, 0))
+        finally:
+            with self._symbol_lock(symbol):
+                if self.inflight.get(symbol, (None, None))[1] is event:
+                    del self.inflight[symbol]
+            event.set()
+
+    def get_candles(self, symbol, timeframe='1h', limit=None, refresh=True):
+        """
+        OHLCV candles for any configured timeframe, refreshed if older than max_age.
+        Returns a fresh DataFrame (callers may add indicator columns to it).
+        refresh=False only reads what is already in memory (no API calls).
+        """
+        if timeframe not in self.timeframes:
+            return self.bitkub.get_candles(symbol, timeframe=timeframe) if refresh else pd.DataFrame()
+
+        if refresh:
+            try:
+                self.refresh(symbol)
+            except Exception as e:
+                print(f"Exception refreshing feed for {symbol}: {e}")
+
+        # Same lock as refresh: never read a tail that is being rewritten
+        with self._symbol_lock(symbol):
+            resampler = self.resamplers.get(symbol)
+            if resampler is None:
+                return pd.DataFrame()
+            return resampler.get(timeframe, limit or self.history_bars)
+
+    def get_analyzed(self, symbol, timeframe='1h', limit=None, refresh=True):
+        """
+        Candles plus indicator columns (same shape as calculate_indicators output).
+        Indicators are recomputed only when the bars changed since the last call
+        and are stored back into the ring buffer.
+        refresh=False only reads what is already in memory (no API calls).
+        """
+        if timeframe not in self.timeframes:
+            if not refresh:
+                return pd.DataFrame()
+            return calculate_indicators(self.bitkub.get_candles(symbol, timeframe=timeframe))
+
+        if refresh:
+            try:
+                self.refresh(symbol)
+            except Exception as e:
+                print(f"Exception refreshing feed for {symbol}: {e}")
+
+        with self._symbol_lock(symbol):
+            resampler = self.resamplers.get(symbol)
+            if resampler is None:
+                return pd.DataFrame()
+
+            buffer = resampler.buffer(timeframe)
+            key = (symbol, timeframe)
+            if self.analyzed.get(key) == buffer.version:
+                df = resampler.get(timeframe, self.history_bars, OHLCV_COLUMNS + INDICATOR_COLUMNS)
+            else:
+                df = calculate_indicators(resampler.get(timeframe, self.history_bars))
+                for name in INDICATOR_COLUMNS:
+                    if name in df.columns:
+                        buffer.set_column(name, df[name].to_numpy(dtype=float))
+                self.analyzed[key] = buffer.version
+
+        if limit:
+            df = df.iloc[-limit:].reset_index(drop=True)
+        return df
+
+    def latest(self, symbol, timeframe='1h'):
+        """
+        Newest bar (OHLCV + stored indicators) as a dict, without building a DataFrame.
+        """
+        with self._symbol_lock(symbol):
+            resampler = self.resamplers.get(symbol)
+            if resampler is None:
+                return {}
+            return resampler.buffer(timeframe).last()
+
+    @property
+    def symbols(self):
+        return sorted(self.resamplers)
+
+    def version(self, symbol, timeframe):
+        """
+        Change counter of the stored bars (None if the symbol/timeframe is not loaded).
+        """
+        with self._symbol_lock(symbol):
+            resampler = self.resamplers.get(symbol)
+            if resampler is None or timeframe not in self.timeframes:
+                return None
+            return resampler.buffer(timeframe).version
@@ -0,0 +1,229 @@
+
+import io
+import os
+import gzip
+import json
+import hashlib
+import threading
+import pandas as pd
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+from utils.indicators import calculate_indicators, INDICATOR_COLUMNS
+from utils.resample import resample_candles
+from utils.signal_rules import DEFAULT_RULESET
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow responses are optional
+    pa = None
+
+ARROW_MIME = 'application/vnd.apache.arrow.stream'
+CANDLE_FIELDS = ['timestamp', 'open', 'high', 'low', 'close', 'volume']
+
+# Buffer versions restart at 1 in every process: ETags built from them carry this nonce
+_PROCESS_NONCE = os.urandom(8).hex()
+
+
+class DataAPIServer:
+    """
+    Read-only HTTP service over the candle feed's in-memory ring buffers and the
+    backfill chunk cache on disk. It never calls the exchange.
+
+    GET /symbols
+    GET /candles?symbol=BTC_THB&timeframe=1h&from=&to=&limit=
+    GET /indicators?symbol=BTC_THB&timeframe=1h&columns=RSI,EMA200&from=&to=&limit=
+    GET /signals?timeframe=1h[&symbol=BTC_THB]
+    GET /screener?metric=rsi&k=10&ascending=1
+
+    Responses carry an ETag (If-None-Match -> 304). Candle/indicator data is
+    columnar JSON, or Arrow IPC with format=arrow / Accept: ARROW_MIME when
+    pyarrow is installed; JSON is gzip-compressed if the client accepts it.
+    """
+    def __init__(self, candle_feed, screener=None, host='127.0.0.1', port=8766):
+        self.feed = candle_feed
+        self.screener = screener
+        self.server = ThreadingHTTPServer((host, port), self._handler_class())
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        print(f"Data API listening on {self.url}")
+        return self.url
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def _series(self, symbol, timeframe, from_ts, to_ts, with_indicators):
+        """
+        In-memory bars, extended backwards with cached chunks from disk when the
+        requested range starts before the ring buffer.
+        """
+        if with_indicators:
+            df = self.feed.get_analyzed(symbol, timeframe, refresh=False)
+        else:
+            df = self.feed.get_candles(symbol, timeframe, refresh=False)
+
+        first = int(df['timestamp'].iloc[0]) if not df.empty else None
+        if from_ts is not None and (first is None or from_ts < first):
+            disk_to = first - 1 if first is not None else (to_ts if to_ts is not None else 2 ** 62)
+            disk = self.feed.backfill.load_cached(symbol, self.feed.base_timeframe, from_ts, disk_to)
+            if not disk.empty:
+                if timeframe != self.feed.base_timeframe:
+                    disk = resample_candles(disk, timeframe, self.feed.base_timeframe)
+                    if first is not None:
+                        disk = disk[disk['timestamp'] < first]
+                df = pd.concat([disk[CANDLE_FIELDS], df[CANDLE_FIELDS] if not df.empty else None], ignore_index=True)
+                if with_indicators:
+                    df = calculate_indicators(df)
+
+        if df.empty:
+            return df
+        if from_ts is not None:
+            df = df[df['timestamp'] >= from_ts]
+        if to_ts is not None:
+            df = df[df['timestamp'] <= to_ts]
+        return df.reset_index(drop=True)
+
+    def handle(self, path, query, headers):
+        """
+        returns: (status, body bytes or object, content type, etag)
+        """
+        arg = lambda name, default=None: query.get(name, [default])[0]
+        as_int = lambda name: int(arg(name)) if arg(name) not in (None, '') else None
+
+        if path == '/symbols':
+            return 200, {'symbols': self.feed.symbols, 'timeframes': self.feed.timeframes}, None, None
+
+        if path in ('/candles', '/indicators'):
+            symbol = arg('symbol')
+            timeframe = arg('timeframe', '1h')
+            if not symbol or timeframe not in self.feed.timeframes:
+                raise ValueError("symbol and a valid timeframe are required")
+            from_ts, to_ts, limit = as_int('from'), as_int('to'), as_int('limit')
+            fmt = arg('format') or ('arrow' if ARROW_MIME in headers.get('Accept', '') else 'json')
+            if fmt == 'arrow' and pa is None:
+                return 406, {'error': 'pyarrow is not installed, use format=json'}, None, None
+
+            with_indicators = path == '/indicators'
+            df = self._series(symbol, timeframe, from_ts, to_ts, with_indicators)
+            if limit and not df.empty:
+                df = df.iloc[-limit:]
+
+            columns = list(CANDLE_FIELDS)
+            if with_indicators:
+                wanted = arg('columns')
+                names = wanted.split(',') if wanted else INDICATOR_COLUMNS
+                columns += [c for c in names if c in df.columns and c in INDICATOR_COLUMNS]
+            df = df[columns] if not df.empty else pd.DataFrame(columns=columns)
+
+            # Identify the rows actually served (memory and disk), valid across restarts
+            content = hashlib.sha1(pd.util.hash_pandas_object(df, index=False).to_numpy().tobytes()).hexdigest()
+            etag = _etag(path, query, fmt, content)
+            if etag in headers.get('If-None-Match', ''):
+                return 304, b'', None, etag
+
+            if fmt == 'arrow':
+                sink = io.BytesIO()
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                with pa.ipc.new_stream(sink, table.schema) as writer:
+                    writer.write_table(table)
+                body = sink.getvalue()
+                return 200, body, ARROW_MIME, etag
+
+            body = {'symbol': symbol, 'timeframe': timeframe, 'columns': _columnar(df)}
+            return 200, body, None, etag
+
+        if path == '/signals':
+            timeframe = arg('timeframe', '1h')
+            symbols = [arg('symbol')] if arg('symbol') else self.feed.symbols
+            versions = [self.feed.version(sym, timeframe) for sym in symbols]
+            newest = [(bar.get('timestamp'), bar.get('close'))
+                      for bar in (self.feed.latest(sym, timeframe) for sym in symbols)]
+            etag = _etag(path, query, symbols, versions, newest, _PROCESS_NONCE)
+            if etag in headers.get('If-None-Match', ''):
+                return 304, b'', None, etag
+
+            frames = {sym: self.feed.get_analyzed(sym, timeframe, refresh=False) for sym in symbols}
+            signals = DEFAULT_RULESET.evaluate_batch(frames)
+            body = {
+                'timeframe': timeframe,
+                'signals': {sym: [s._asdict() for s in sigs] for sym, sigs in signals.items()}
+            }
+            return 200, body, None, etag
+
+        if path == '/screener' and self.screener:
+            metric = arg('metric', 'rsi')
+            k = as_int('k') or 10
+            ascending = arg('ascending', '0') in ('1', 'true')
+            ranked = self.screener.top(metric, k, ascending)
+            return 200, {'metric': metric, 'results': [{'symbol': s, 'value': v} for s, v in ranked]}, None, None
+
+        return 404, {'error': 'not found'}, None, None
+
+    def _handler_class(self):
+        api = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                url = urlparse(self.path)
+                try:
+                    status, body, content_type, etag = api.handle(url.path, parse_qs(url.query), self.headers)
+                except (ValueError, KeyError) as e:
+                    status, body, content_type, etag = 400, {'error': str(e)}, None, None
+                except Exception as e:
+                    print(f"Data API error on {self.path}: {e}")
+                    status, body, content_type, etag = 500, {'error': 'internal error'}, None, None
+
+                headers = {}
+                if not isinstance(body, bytes):
+                    body = json.dumps(body, separators=(',', ':')).encode()
+                    content_type = 'application/json'
+                    if len(body) > 1024 and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                        body = gzip.compress(body)
+                        headers['Content-Encoding'] = 'gzip'
+                if etag:
+                    headers['ETag'] = etag
+                    headers['Cache-Control'] = 'no-cache'
+
+                self.send_response(status)
+                if status != 304:
+                    self.send_header('Content-Type', content_type)
+                    self.send_header('Content-Length', str(len(body)))
+                for key, value in headers.items():
+                    self.send_header(key, value)
+                self.end_headers()
+                if status != 304:
+                    self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def _etag(*parts):
+    if len(parts) == 1 and isinstance(parts[0], bytes):
+        digest = hashlib.sha1(parts[0]).hexdigest()
+    else:
+        normalized = [sorted(p.items()) if isinstance(p, dict) else p for p in parts]
+        digest = hashlib.sha1(repr(normalized).encode()).hexdigest()
+    return f'"{digest[:20]}"'
+
+
+def _columnar(df):
+    """
+    Column name -> list, with NaN as null.
+    """
+    out = {}
+    for name in df.columns:
+        values = df[name].tolist()
+        out[name] = [None if isinstance(v, float) and v != v else v for v in values]
+    return out
@@ -0,0 +1,240 @@
+
+import math
+import time
+import itertools
+import threading
+import contextlib
+from collections import Counter, deque
+
+# Priority classes (lower value is served first)
+ALERT = 0      # background monitor / alert-critical fetches
+LIVE = 1       # interactive dashboard
+BACKFILL = 2   # history downloads, trade recording
+
+PRIORITY_NAMES = {ALERT: 'alert', LIVE: 'live', BACKFILL: 'backfill'}
+
+# Endpoint classes, each with its own token bucket
+HISTORY = 'history'  # /tradingview/history
+MARKET = 'market'    # /api/v3/market/*
+
+# Seconds of request history used to measure budget utilization
+UTILIZATION_HORIZON = 60
+
+# Seconds of waiting that promote a request by one priority class, so lower
+# classes still make progress under sustained higher-priority load
+PRIORITY_AGING = 2
+
+# endpoint class -> (requests per second, burst)
+DEFAULT_LIMITS = {
+    HISTORY: (10, 20),
+    MARKET: (10, 20)
+}
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.capacity = burst
+        self.tokens = burst
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+
+    def wait_time(self, now):
+        """
+        Seconds until one token is available (0 if available now).
+        """
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+    def consume(self):
+        self.tokens -= 1
+
+
+class RequestBudget:
+    """
+    Process-wide API budget: one token bucket per endpoint class, and callers
+    waiting on the same bucket are served by priority, then FIFO. A waiting
+    request gains one priority class every `aging` seconds, so under sustained
+    LIVE load a BACKFILL call waits only about `aging` seconds longer than the
+    LIVE calls it competes with instead of starving (aging=0: strict priority).
+
+    The priority of a call comes from the `priority` argument or from the
+    calling thread's context (`with budget.priority(ALERT): ...`); default LIVE.
+    Endpoint classes without a limit are not throttled.
+    """
+    def __init__(self, limits=DEFAULT_LIMITS, aging=PRIORITY_AGING):
+        self.buckets = {cls: TokenBucket(rate, burst) for cls, (rate, burst) in limits.items()}
+        self.waiters = {cls: [] for cls in self.buckets}
+        self.granted = {cls: deque() for cls in self.buckets}  # grant times, for utilization
+        self.cond = threading.Condition()
+        self.seq = itertools.count()
+        self.aging = aging
+        self.local = threading.local()
+        self.stats = Counter()
+
+    @contextlib.contextmanager
+    def priority(self, level):
+        previous = getattr(self.local, 'priority', None)
+        self.local.priority = level
+        try:
+            yield
+        finally:
+            self.local.priority = previous
+
+    def current_priority(self, default=LIVE):
+        level = getattr(self.local, 'priority', None)
+        return default if level is None else level
+
+    def acquire(self, endpoint_class, priority=None, timeout=None):
+        """
+        Block until a request of `endpoint_class` may be sent.
+        returns: True, or False if `timeout` seconds passed first
+        """
+        if priority is None:
+            priority = self.current_priority()
+        bucket = self.buckets.get(endpoint_class)
+        if bucket is None:
+            return True
+
+        queue = self.waiters[endpoint_class]
+        started = time.monotonic()
+        entry = (priority, next(self.seq), started)
+        deadline = started + timeout if timeout is not None else None
+
+        with self.cond:
+            queue.append(entry)
+            was_head = False
+            try:
+                while True:
+                    now = time.monotonic()
+                    wait = None  # not at the head of the queue: wait for a notify
+                    if self._head(queue, now) == entry:
+                        was_head = True
+                        wait = bucket.wait_time(now)
+                        if wait <= 0:
+                            bucket.consume()
+                            self._record_grant(endpoint_class, now)
+                            self.stats[(endpoint_class, PRIORITY_NAMES.get(priority, priority))] += 1
+                            self.stats[('wait', PRIORITY_NAMES.get(priority, priority))] += now - started
+                            return True
+                    elif was_head:
+                        # An older waiter aged past us while we waited for a token
+                        was_head = False
+                        self.cond.notify_all()
+                    if deadline is not None:
+                        if now >= deadline:
+                            return False
+                        wait = deadline - now if wait is None else min(wait, deadline - now)
+                    self.cond.wait(wait)
+            finally:
+                queue.remove(entry)
+                self.cond.notify_all()
+
+    def _head(self, queue, now):
+        """
+        Waiter served next: lowest aged priority, then arrival order.
+        """
+        if not self.aging:
+            return min(queue)
+        return min(queue, key=lambda e: (e[0] - (now - e[2]) / self.aging, e[1]))
+
+    def _record_grant(self, endpoint_class, now):
+        granted = self.granted[endpoint_class]
+        granted.append(now)
+        while granted[0] < now - UTILIZATION_HORIZON:
+            granted.popleft()
+
+    def utilization(self, endpoint_class):
+        """
+        Share of the endpoint class's rate used over the last UTILIZATION_HORIZON
+        seconds (1.0 if callers are queued or it is paused after a 429, 0 if unlimited).
+        """
+        bucket = self.buckets.get(endpoint_class)
+        if bucket is None:
+            return 0.0
+        with self.cond:
+            now = time.monotonic()
+            if self.waiters[endpoint_class] or now < bucket.blocked_until:
+                return 1.0
+            recent = sum(1 for t in self.granted[endpoint_class] if t >= now - UTILIZATION_HORIZON)
+            return recent / (bucket.rate * UTILIZATION_HORIZON)
+
+    def penalize(self, endpoint_class, seconds):
+        """
+        The exchange answered 429: pause the whole endpoint class for `seconds`.
+        """
+        bucket = self.buckets.get(endpoint_class)
+        if bucket is None:
+            return
+        with self.cond:
+            bucket.blocked_until = max(bucket.blocked_until, time.monotonic() + seconds)
+            bucket.tokens = 0
+            self.stats[('429', endpoint_class)] += 1
+            self.cond.notify_all()
+
+
+class AdaptivePoller:
+    """
+    Per-symbol polling schedule: volatile symbols are checked more often.
+
+    From the recent realized volatility of each symbol it estimates how long
+    the price takes to move `target_move` percent (random-walk scaling) and
+    uses that as the next check interval, clamped to [min_interval, max_interval].
+
+    With a `budget`, intervals are only stretched while the endpoint class is
+    under pressure (utilization >= `pressure`); otherwise every symbol is due.
+    """
+    def __init__(self, min_interval=60, max_interval=600, target_move=0.5, lookback=24,
+                 budget=None, endpoint_class=HISTORY, pressure=0.5):
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.target_move = target_move
+        self.lookback = lookback
+        self.budget = budget
+        self.endpoint_class = endpoint_class
+        self.pressure = pressure
+        self.next_due = {}
+        self.intervals = {}
+        self.lock = threading.Lock()
+
+    def due(self, symbols, now=None):
+        """
+        Symbols that should be refreshed now (unknown symbols are always due).
+        """
+        if self.budget is not None and self.budget.utilization(self.endpoint_class) < self.pressure:
+            return list(symbols)
+        now = now or time.time()
+        with self.lock:
+            return [sym for sym in symbols if self.next_due.get(sym, 0) <= now]
+
+    def observe(self, symbol, closes, bar_seconds, now=None):
+        """
+        closes: recent close prices (oldest first) sampled every bar_seconds
+        returns: the interval chosen for this symbol
+        """
+        now = now or time.time()
+        closes = [float(c) for c in list(closes)[-(self.lookback + 1):] if c == c]
+        returns = [(b - a) / a * 100 for a, b in zip(closes, closes[1:]) if a]
+
+        interval = self.max_interval
+        if len(returns) >= 2:
+            mean = sum(returns) / len(returns)
+            sigma = math.sqrt(sum((r - mean) ** 2 for r in returns) / (len(returns) - 1))
+            if sigma > 0:
+                interval = bar_seconds * (self.target_move / sigma) ** 2
+            # A large move on the newest bar keeps the symbol on the fast schedule
+            if abs(returns[-1]) >= self.target_move:
+                interval = self.min_interval
+        interval = min(self.max_interval, max(self.min_interval, interval))
+
+        with self.lock:
+            self.intervals[symbol] = interval
+            self.next_due[symbol] = now + interval
+        return interval
+
+
+# Shared by every BitkubService that is not given its own budget
+DEFAULT_BUDGET = RequestBudget()
@@ -0,0 +1,241 @@
+
+import math
+import time
+import threading
+from bisect import bisect_left, insort
+from collections import deque
+from services.bitkub_service import BitkubService, TIMEFRAME_SECONDS
+from services.request_budget import BACKFILL
+from utils.indicators import calculate_indicators
+
+# Ranking metrics kept by the screener
+METRICS = ('rsi', 'percent_change', 'volume', 'ema200_distance')
+
+
+class SortedIndex:
+    """
+    (value, symbol) pairs kept sorted with bisect.
+    update is O(log n) search + O(n) shift; top-k queries are O(k).
+    """
+    def __init__(self):
+        self.items = []
+        self.values = {}
+
+    def update(self, symbol, value):
+        self.remove(symbol)
+        if value is None or (isinstance(value, float) and math.isnan(value)):
+            return
+        self.values[symbol] = value
+        insort(self.items, (value, symbol))
+
+    def remove(self, symbol):
+        old = self.values.pop(symbol, None)
+        if old is not None:
+            i = bisect_left(self.items, (old, symbol))
+            del self.items[i]
+
+    def top(self, k, ascending=False):
+        if ascending:
+            return [(sym, value) for value, sym in self.items[:k]]
+        return [(sym, value) for value, sym in reversed(self.items[-k:])] if k else []
+
+    def __len__(self):
+        return len(self.items)
+
+
+class MarketScreener:
+    """
+    Incrementally maintained rankings across THB pairs.
+
+    Ticker metrics (percent change, quote volume) come from one all-symbol
+    ticker request; indicator metrics (RSI, % distance from EMA200) are pushed
+    per symbol as its `timeframe` candles update (the watchlist, via the candle
+    feed) and filled in for every other pair listed by get_symbols by
+    refresh_indicators. A close crossing EMA200 on a closed bar is recorded
+    once per bar as an event that the background monitor can turn into alerts.
+    """
+    def __init__(self, bitkub=None, timeframe='1h', quote='THB', max_events=500, symbols_max_age=24 * 3600):
+        self.bitkub = bitkub or BitkubService()
+        self.timeframe = timeframe
+        self.quote = quote
+        self.indexes = {metric: SortedIndex() for metric in METRICS}
+        self.ema200_side = {}
+        self.ema200_checked = {}  # symbol -> timestamp of the last closed bar checked for a cross
+        self.indicator_updated = {}  # symbol -> time its indicator metrics were last updated
+        self.market_symbols = []
+        self.symbols_max_age = symbols_max_age
+        self.last_symbols_update = 0
+        self.events = deque(maxlen=max_events)
+        self.event_seq = 0
+        self.last_ticker_update = 0
+        self.lock = threading.Lock()
+
+    def refresh_tickers(self, max_age=0):
+        """
+        Fetch all tickers in a single request and update ticker-based rankings.
+        """
+        if max_age and time.time() - self.last_ticker_update < max_age:
+            return
+        tickers = self.bitkub.get_ticker()
+        if tickers:
+            self.update_tickers(tickers)
+
+    def update_tickers(self, tickers):
+        """
+        tickers: /api/v3/market/ticker result (list of dicts with 'symbol')
+        """
+        if isinstance(tickers, dict):
+            tickers = [dict(row, symbol=sym) for sym, row in tickers.items()]
+
+        suffix = f"_{self.quote}"
+        with self.lock:
+            for row in tickers:
+                sym = row.get('symbol', '')
+                if not sym.endswith(suffix):
+                    continue
+                try:
+                    self.indexes['percent_change'].update(sym, float(row.get('percent_change', 0)))
+                    self.indexes['volume'].update(sym, float(row.get('quote_volume', 0)))
+                except (TypeError, ValueError):
+                    continue
+            self.last_ticker_update = time.time()
+
+    def update_frame(self, symbol, df):
+        """
+        df: `self.timeframe` candles with 'close', 'RSI' and 'EMA200' (e.g. from
+        CandleFeed.get_analyzed). Rankings use the newest (possibly forming) bar,
+        EMA200 crosses only the newest closed bar.
+        """
+        if df is None or df.empty:
+            return
+        bar_seconds = TIMEFRAME_SECONDS[self.timeframe]
+        closed = df[df['timestamp'] + bar_seconds <= time.time()]
+        self.update_indicators(symbol, df.iloc[-1], closed.iloc[-1] if not closed.empty else None)
+
+    def update_indicators(self, symbol, row, closed=None):
+        """
+        row: newest `self.timeframe` bar with 'close', 'RSI' and 'EMA200'
+        closed: newest closed bar, checked for an EMA200 cross once per bar timestamp
+        """
+        if row is None or not len(row):
+            return
+        close = _number(row.get('close'))
+        ema200 = _number(row.get('EMA200'))
+        with self.lock:
+            self.indicator_updated[symbol] = time.time()
+            self.indexes['rsi'].update(symbol, _number(row.get('RSI')))
+            if close is None or ema200 is None or not ema200:
+                self.indexes['ema200_distance'].remove(symbol)
+            else:
+                self.indexes['ema200_distance'].update(symbol, (close - ema200) / ema200 * 100)
+
+            if closed is not None:
+                self._check_cross(symbol, closed)
+
+    def _check_cross(self, symbol, bar):
+        timestamp = _number(bar.get('timestamp'))
+        close = _number(bar.get('close'))
+        ema200 = _number(bar.get('EMA200'))
+        if timestamp is None or close is None or ema200 is None:
+            return
+        # A forming bar swinging around EMA200 must not fire on every update
+        if timestamp <= self.ema200_checked.get(symbol, float('-inf')):
+            return
+        self.ema200_checked[symbol] = timestamp
+
+        side = 'above' if close > ema200 else 'below'
+        previous = self.ema200_side.get(symbol)
+        self.ema200_side[symbol] = side
+        if previous and previous != side:
+            self.event_seq += 1
+            self.events.append({
+                'seq': self.event_seq,
+                'symbol': symbol,
+                'event': f"cross_{side}_ema200",
+                'close': close,
+                'ema200': ema200,
+                'time': int(timestamp)
+            })
+
+    def refresh_symbols(self):
+        """
+        All active pairs in the screener's quote currency (get_symbols, cached).
+        """
+        if self.market_symbols and time.time() - self.last_symbols_update < self.symbols_max_age:
+            return self.market_symbols
+        suffix = f"_{self.quote}"
+        listed = [
+            row.get('symbol', '').upper() for row in self.bitkub.get_symbols()
+            if row.get('status', 'active') == 'active'
+        ]
+        symbols = sorted(sym for sym in listed if sym.endswith(suffix))
+        if symbols:
+            self.market_symbols = symbols
+            self.last_symbols_update = time.time()
+        return self.market_symbols
+
+    def refresh_indicators(self, batch=20, max_age=None):
+        """
+        Update RSI / EMA200 rankings for up to `batch` pairs whose indicator
+        metrics are the stalest (older than max_age, default one bar), so the
+        rankings cover the whole market rather than the watchlist only.
+        One history request per pair, at BACKFILL priority.
+        returns: number of pairs updated
+        """
+        max_age = max_age or TIMEFRAME_SECONDS[self.timeframe]
+        now = time.time()
+        with self.lock:
+            stale = sorted((self.indicator_updated.get(sym, 0), sym) for sym in self.refresh_symbols())
+        updated = 0
+        for last_update, sym in stale[:batch]:
+            if now - last_update < max_age:
+                break
+            # Mark first so a failing pair does not block the others
+            with self.lock:
+                self.indicator_updated[sym] = now
+            df = self.bitkub.get_candles(sym, timeframe=self.timeframe, limit=50, priority=BACKFILL)
+            if df is None or df.empty:
+                continue
+            try:
+                self.update_frame(sym, calculate_indicators(df))
+                updated += 1
+            except Exception as e:
+                print(f"Screener: indicators failed for {sym}: {e}")
+        return updated
+
+    def coverage(self, metric):
+        """
+        Number of symbols currently ranked for `metric`.
+        """
+        with self.lock:
+            return len(self.indexes[metric])
+
+    def top(self, metric, k=10, ascending=False):
+        """
+        Top-k (symbol, value) for a metric, e.g. most oversold: top('rsi', ascending=True)
+        """
+        with self.lock:
+            return self.indexes[metric].top(k, ascending)
+
+    def value(self, metric, symbol, default=None):
+        with self.lock:
+            return self.indexes[metric].values.get(symbol, default)
+
+    def recent_events(self, k=20):
+        with self.lock:
+            return list(self.events)[-k:]
+
+    def events_since(self, seq):
+        """
+        Events newer than `seq` (each consumer, e.g. the monitor, keeps its own cursor).
+        """
+        with self.lock:
+            return [e for e in self.events if e['seq'] > seq]
+
+
+def _number(value):
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return None
+    return None if math.isnan(value) else value
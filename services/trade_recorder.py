@@ -0,0 +1,100 @@
+
+import time
+import atexit
+import threading
+from collections import deque
+from services.bitkub_service import BitkubService
+from utils.tick_archive import TickArchive
+from services.request_budget import BACKFILL
+
+
+class TradeRecorder:
+    """
+    Background poller that keeps every trade it sees: polls /api/v3/market/trades
+    per symbol, drops trades already recorded, and appends the rest to a TickArchive.
+    """
+    def __init__(self, symbols, bitkub=None, archive=None, interval=15, poll_limit=100, flush_interval=60):
+        self.symbols = list(symbols)
+        self.bitkub = bitkub or BitkubService()
+        self.archive = archive or TickArchive()
+        self.interval = interval
+        self.poll_limit = poll_limit
+        self.flush_interval = flush_interval
+        self.high_water = {}  # symbol -> newest recorded timestamp
+        self.recent_keys = {symbol: deque(maxlen=2 * poll_limit) for symbol in self.symbols}
+        self._seed_from_archive()
+        self.is_running = False
+        self.thread = None
+        self.last_flush = time.time()
+
+    def _seed_from_archive(self):
+        """
+        Resume deduplication after a restart: trades up to the newest archived
+        timestamp are already recorded (those at that exact second are remembered
+        individually because several trades can share it).
+        """
+        for symbol in self.symbols:
+            last = self.archive.last_timestamp(symbol)
+            if last is None:
+                continue
+            self.high_water[symbol] = last
+            for t in self.archive.scan(symbol, last, last).itertuples():
+                self.recent_keys[symbol].append((int(t.timestamp), float(t.price), float(t.amount),
+                                                 'BUY' if t.is_buy else 'SELL'))
+
+    def start(self):
+        if not self.is_running:
+            self.is_running = True
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+            # The poll thread is a daemon: write pending trades when the process exits
+            atexit.register(self.stop)
+            print("Trade Recorder Started!")
+
+    def stop(self):
+        self.is_running = False
+        self.archive.flush()
+
+    def _new_trades(self, symbol, trades):
+        """
+        Bitkub trades carry no id, so a trade is identified by (ts, price, amount, side).
+        Trades older than the high-water mark or seen in the last polls are dropped.
+        """
+        high_water = self.high_water.get(symbol, 0)
+        keys = self.recent_keys.setdefault(symbol, deque(maxlen=2 * self.poll_limit))
+        seen = set(keys)
+        fresh = []
+        for t in sorted(trades, key=lambda t: t[0]):
+            key = (int(t[0]), float(t[1]), float(t[2]), str(t[3]).upper())
+            if key[0] < high_water or key in seen:
+                continue
+            seen.add(key)
+            keys.append(key)
+            fresh.append((key[0], key[1], key[2], key[3] == 'BUY'))
+        if fresh:
+            self.high_water[symbol] = fresh[-1][0]
+        return fresh
+
+    def poll(self, symbol):
+        """
+        Fetch and record new trades for one symbol; returns how many were new.
+        """
+        # Recording is never urgent: yield to alert and dashboard requests
+        trades = self.bitkub.get_recent_trades(symbol, limit=self.poll_limit, priority=BACKFILL)
+        fresh = self._new_trades(symbol, trades or [])
+        if fresh:
+            self.archive.append(symbol, fresh)
+        return len(fresh)
+
+    def _run(self):
+        while self.is_running:
+            for symbol in self.symbols:
+                try:
+                    self.poll(symbol)
+                except Exception as e:
+                    print(f"Trade Recorder Error {symbol}: {e}")
+
+            if time.time() - self.last_flush >= self.flush_interval:
+                self.archive.flush()
+                self.last_flush = time.time()
+            time.sleep(self.interval)
@@ -62,3 +62,31 @@ def create_rsi_chart(df):
         yaxis=dict(range=[0, 100])
     )
     return fig
+
+def create_correlation_heatmap(matrix):
+    """
+    Heatmap of a symbols x symbols correlation matrix (DataFrame)
+    """
+    if matrix.empty:
+        return go.Figure()
+
+    labels = [s.replace("_THB", "") for s in matrix.columns]
+    fig = go.Figure(go.Heatmap(
+        z=matrix.values,
+        x=labels,
+        y=labels,
+        zmin=-1,
+        zmax=1,
+        colorscale='RdBu_r',
+        text=matrix.round(2).values,
+        texttemplate="%{text}" if len(labels) <= 20 else None,
+        hovertemplate="%{y} / %{x}: %{z:.2f}<extra></extra>"
+    ))
+
+    fig.update_layout(
+        title="ความสัมพันธ์ของราคา (Correlation)",
+        height=max(400, 25 * len(labels)),
+        template='plotly_dark',
+        yaxis=dict(autorange='reversed')
+    )
+    return fig
@@ -0,0 +1,207 @@
+
+import threading
+import numpy as np
+import pandas as pd
+from collections import deque
+
+# Columns added to candle frames by CorrelationEngine.annotate (usable in signal rules)
+CORRELATION_COLUMNS = ('BTC_CORR', 'BTC_BETA')
+
+
+class CorrelationEngine:
+    """
+    Rolling correlation and beta across a watchlist, updated incrementally.
+
+    Keeps the last `window` closed-bar log returns of every symbol and four
+    running N x N sums (pair count, sum x, sum x^2, sum xy, each over the bars
+    where both symbols of a pair have data). A new bar adds one outer product
+    and the bar leaving the window subtracts one, so each bar costs O(N^2)
+    regardless of the window length. The sums are rebuilt from the stored
+    returns every `window` bars to keep floating-point drift bounded.
+
+    Correlation is pairwise-complete Pearson; beta is cov(symbol, benchmark) /
+    var(benchmark). Pairs with fewer than `min_periods` common bars are NaN.
+    """
+    def __init__(self, symbols, benchmark='BTC_THB', window=48, min_periods=12, max_lag=2, history=300):
+        self.symbols = list(symbols)
+        self.index = {sym: i for i, sym in enumerate(self.symbols)}
+        self.benchmark = benchmark
+        self.window = window
+        self.min_periods = min_periods
+        self.max_lag = max_lag  # bars to wait for a lagging symbol before committing without it
+        n = len(self.symbols)
+
+        self.returns = np.zeros((window, n))
+        self.present = np.zeros((window, n), dtype=bool)
+        self.head = 0
+        self.size = 0
+        self.count = np.zeros((n, n))
+        self.sum_x = np.zeros((n, n))    # [i, j]: sum of x_i over bars where i and j are present
+        self.sum_xx = np.zeros((n, n))   # [i, j]: sum of x_i^2 over the same bars
+        self.sum_xy = np.zeros((n, n))   # [i, j]: sum of x_i * x_j
+        self.prev_close = np.full(n, np.nan)
+        self.last_timestamp = None
+        self.commits = 0
+
+        # Benchmark correlation / beta after each committed bar (for annotate)
+        self.history_ts = deque(maxlen=history)
+        self.history_corr = deque(maxlen=history)
+        self.history_beta = deque(maxlen=history)
+        self._history_arrays = None
+        self.lock = threading.Lock()
+
+    def _accumulate(self, x, present, sign):
+        m = present.astype(float)
+        x = np.where(present, x, 0.0)
+        self.count += sign * np.outer(m, m)
+        self.sum_x += sign * np.outer(x, m)
+        self.sum_xx += sign * np.outer(x * x, m)
+        self.sum_xy += sign * np.outer(x, x)
+
+    def _rebuild(self):
+        # Unused slots are marked not present and contribute nothing
+        m = self.present.astype(float)
+        x = np.where(self.present, self.returns, 0.0)
+        self.count = m.T @ m
+        self.sum_x = x.T @ m
+        self.sum_xx = (x * x).T @ m
+        self.sum_xy = x.T @ x
+
+    def _push(self, x, present):
+        if self.size == self.window:
+            self._accumulate(self.returns[self.head], self.present[self.head], -1)
+        self.returns[self.head] = x
+        self.present[self.head] = present
+        self._accumulate(x, present, 1)
+        self.head = (self.head + 1) % self.window
+        self.size = min(self.size + 1, self.window)
+        self.commits += 1
+        if self.commits % self.window == 0:
+            self._rebuild()
+
+    def _commit(self, timestamp, closes):
+        if self.last_timestamp is None:
+            # First bar only provides the base close for the first returns
+            self.prev_close = closes
+            self.last_timestamp = timestamp
+            return
+        with np.errstate(divide='ignore', invalid='ignore'):
+            x = np.log(closes / self.prev_close)
+        present = np.isfinite(x)
+        self._push(np.where(present, x, 0.0), present)
+        # A symbol missing this bar has no return for the next one either
+        self.prev_close = closes
+        self.last_timestamp = timestamp
+
+        corr, beta = self._benchmark_stats()
+        self.history_ts.append(timestamp)
+        self.history_corr.append(corr)
+        self.history_beta.append(beta)
+        self._history_arrays = None
+
+    def _benchmark_stats(self):
+        n = len(self.symbols)
+        b = self.index.get(self.benchmark)
+        if b is None:
+            return np.full(n, np.nan), np.full(n, np.nan)
+        count = self.count[:, b]
+        with np.errstate(divide='ignore', invalid='ignore'):
+            cov = (self.sum_xy[:, b] - self.sum_x[:, b] * self.sum_x[b, :] / count) / (count - 1)
+            var_sym = (self.sum_xx[:, b] - self.sum_x[:, b] ** 2 / count) / (count - 1)
+            var_bench = (self.sum_xx[b, :] - self.sum_x[b, :] ** 2 / count) / (count - 1)
+            corr = np.clip(cov / np.sqrt(var_sym * var_bench), -1, 1)
+            beta = cov / var_bench
+        valid = count >= self.min_periods
+        return np.where(valid, corr, np.nan), np.where(valid, beta, np.nan)
+
+    def sync(self, frames):
+        """
+        Commit every newly closed bar found in `frames` (symbol -> DataFrame with
+        timestamp / close). A bar is committed once every symbol has moved past it,
+        or after `max_lag` newer bars exist (lagging symbols then count as missing).
+        The newest bar is still forming and is never committed.
+        returns: number of bars committed
+        """
+        stamps = {}
+        for sym, df in frames.items():
+            if sym in self.index and df is not None and not df.empty:
+                stamps[sym] = df['timestamp'].to_numpy(dtype=np.int64)
+        if not stamps:
+            return 0
+
+        with self.lock:
+            floor = self.last_timestamp if self.last_timestamp is not None else -2 ** 63
+            candidates = np.unique(np.concatenate([ts[ts > floor] for ts in stamps.values()]))
+            if len(candidates) < 2:
+                return 0
+            # Before the first commit only the newest window (+1 for the first return) matters
+            if self.last_timestamp is None:
+                candidates = candidates[-(self.window + 2):]
+
+            oldest_last = min(ts[-1] for ts in stamps.values())
+            closes_by_symbol = {}  # read lazily: most cycles have no closed bar to commit
+            committed = 0
+            for k, timestamp in enumerate(candidates[:-1]):
+                newer = len(candidates) - 1 - k
+                if timestamp >= oldest_last and newer <= self.max_lag:
+                    break
+                if not closes_by_symbol:
+                    closes_by_symbol = {sym: frames[sym]['close'].to_numpy(dtype=float) for sym in stamps}
+                closes = np.full(len(self.symbols), np.nan)
+                for sym, ts in stamps.items():
+                    pos = np.searchsorted(ts, timestamp)
+                    if pos < len(ts) and ts[pos] == timestamp:
+                        closes[self.index[sym]] = closes_by_symbol[sym][pos]
+                self._commit(int(timestamp), closes)
+                committed += 1
+            return committed
+
+    def annotate(self, frames):
+        """
+        Add CORRELATION_COLUMNS to each frame in place: correlation and beta
+        versus the benchmark over the window ending at that row's bar (the
+        forming bar gets the latest committed values).
+        """
+        with self.lock:
+            if self._history_arrays is None and self.history_ts:
+                self._history_arrays = (np.array(self.history_ts, dtype=np.int64),
+                                        np.array(self.history_corr), np.array(self.history_beta))
+            arrays = self._history_arrays
+
+        for sym, df in frames.items():
+            if df is None or df.empty:
+                continue
+            i = self.index.get(sym)
+            if arrays is None or i is None:
+                df['BTC_CORR'] = np.nan
+                df['BTC_BETA'] = np.nan
+                continue
+            ts, corr, beta = arrays
+            pos = np.searchsorted(ts, df['timestamp'].to_numpy(dtype=np.int64), side='right') - 1
+            known = pos >= 0
+            pos = np.maximum(pos, 0)
+            df['BTC_CORR'] = np.where(known, corr[pos, i], np.nan)
+            df['BTC_BETA'] = np.where(known, beta[pos, i], np.nan)
+
+    def latest(self, symbol):
+        """
+        (correlation, beta) versus the benchmark after the newest committed bar.
+        """
+        i = self.index.get(symbol)
+        with self.lock:
+            if i is None or not self.history_ts:
+                return float('nan'), float('nan')
+            return float(self.history_corr[-1][i]), float(self.history_beta[-1][i])
+
+    def matrix(self):
+        """
+        Full correlation matrix of the watchlist as a DataFrame (symbols x symbols).
+        """
+        with self.lock:
+            count = self.count
+            with np.errstate(divide='ignore', invalid='ignore'):
+                cov = (self.sum_xy - self.sum_x * self.sum_x.T / count) / (count - 1)
+                var = (self.sum_xx - self.sum_x ** 2 / count) / (count - 1)
+                corr = cov / np.sqrt(var * var.T)
+            corr = np.where(count >= self.min_periods, np.clip(corr, -1, 1), np.nan)
+        return pd.DataFrame(corr, index=self.symbols, columns=self.symbols)
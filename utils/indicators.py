@@ -1,6 +1,10 @@
 
 import pandas as pd
 import pandas_ta as ta
+from utils.signal_rules import DEFAULT_RULESET
+
+# Columns added by calculate_indicators
+INDICATOR_COLUMNS = ('RSI', 'MACD_12_26_9', 'MACDh_12_26_9', 'MACDs_12_26_9', 'EMA12', 'EMA26', 'EMA200')
 
 def calculate_indicators(df):
     """
@@ -36,33 +40,6 @@ def calculate_indicators(df):
 def check_signals(df):
     """
     Check for buy/sell signals based on the latest data
-    Returns a list of signal strings
+    Returns a list of signal strings (see utils.signal_rules for structured signals)
     """
-    if df.empty or len(df) < 2:
-        return []
-
-    signals = []
-    last_row = df.iloc[-1]
-    prev_row = df.iloc[-2]
-
-    # RSI Signals
-    if last_row['RSI'] < 30:
-        signals.append("RSI ต่ำกว่า 30 (Oversold - สัญญาณซื้อ)")
-    elif last_row['RSI'] > 70:
-        signals.append("RSI สูงกว่า 70 (Overbought - สัญญาณขาย)")
-
-    # EMA Crossover (Golden Cross / Death Cross)
-    # Check if EMA12 crosses EMA26
-    if prev_row['EMA12'] < prev_row['EMA26'] and last_row['EMA12'] > last_row['EMA26']:
-        signals.append("EMA Golden Cross (12 ตัด 26 ขึ้น - สัญญาณซื้อ)")
-    elif prev_row['EMA12'] > prev_row['EMA26'] and last_row['EMA12'] < last_row['EMA26']:
-        signals.append("EMA Death Cross (12 ตัด 26 ลง - สัญญาณขาย)")
-    
-    # Check price relative to EMA200 (Trend Filter)
-    if 'EMA200' in df.columns and pd.notna(last_row['EMA200']):
-        if last_row['close'] > last_row['EMA200']:
-           signals.append("ราคาอยู่เหนือ EMA200 (แนวโน้มขาขึ้น)")
-        elif last_row['close'] < last_row['EMA200']:
-           signals.append("ราคาอยู่ต่ำกว่า EMA200 (แนวโน้มขาลง)")
-
-    return signals
+    return [s.message for s in DEFAULT_RULESET.evaluate(df)]
@@ -0,0 +1,161 @@
+
+import numpy as np
+import pandas as pd
+from services.bitkub_service import TIMEFRAME_SECONDS
+from utils.ring_buffer import CandleRingBuffer, OHLCV_COLUMNS
+
+
+def bucket_start(timestamps, timeframe, offset=0):
+    """
+    Floor unix timestamps to the start of their `timeframe` bucket.
+    offset: seconds to shift bucket boundaries (e.g. to align 1D to a local midnight)
+    """
+    bar_seconds = TIMEFRAME_SECONDS[timeframe]
+    return (timestamps - offset) // bar_seconds * bar_seconds + offset
+
+
+def aggregate_ohlcv(timestamps, columns, timeframe, offset=0):
+    """
+    Vectorized OHLCV aggregation of sorted base arrays.
+    columns: dict with 'open', 'high', 'low', 'close', 'volume' arrays
+    returns: (bucket timestamps, matrix with one row per bucket in OHLCV_COLUMNS order)
+    """
+    if not len(timestamps):
+        return np.empty(0, dtype=np.int64), np.empty((0, len(OHLCV_COLUMNS)))
+
+    buckets = bucket_start(np.asarray(timestamps, dtype=np.int64), timeframe, offset)
+    starts = np.flatnonzero(np.r_[True, buckets[1:] != buckets[:-1]])
+    ends = np.r_[starts[1:], len(buckets)] - 1
+
+    matrix = np.column_stack([
+        np.asarray(columns['open'])[starts],
+        np.maximum.reduceat(np.asarray(columns['high']), starts),
+        np.minimum.reduceat(np.asarray(columns['low']), starts),
+        np.asarray(columns['close'])[ends],
+        np.add.reduceat(np.asarray(columns['volume']), starts),
+    ])
+    return buckets[starts], matrix
+
+
+def resample_candles(df, timeframe, base_timeframe, offset=0, drop_incomplete_head=True):
+    """
+    Aggregate a base OHLCV DataFrame (sorted by timestamp) into a higher timeframe.
+    Adds an 'is_partial' column that is True for the trailing bucket while it is still forming.
+    drop_incomplete_head: drop the first bucket if the base series starts mid-bucket
+    (its open/high/low would be wrong).
+    """
+    if TIMEFRAME_SECONDS[timeframe] % TIMEFRAME_SECONDS[base_timeframe] != 0:
+        raise ValueError(f"Cannot build {timeframe} from {base_timeframe}")
+
+    if df.empty:
+        return pd.DataFrame(columns=['timestamp', *OHLCV_COLUMNS, 'datetime', 'is_partial'])
+
+    ts, matrix = aggregate_ohlcv(df['timestamp'].to_numpy(), {c: df[c].to_numpy(dtype=np.float64) for c in OHLCV_COLUMNS}, timeframe, offset)
+    out = pd.DataFrame(matrix, columns=OHLCV_COLUMNS)
+    out.insert(0, 'timestamp', ts)
+
+    last_base_end = int(df['timestamp'].iloc[-1]) + TIMEFRAME_SECONDS[base_timeframe]
+    out['is_partial'] = (out['timestamp'] + TIMEFRAME_SECONDS[timeframe]) > last_base_end
+
+    if drop_incomplete_head and int(df['timestamp'].iloc[0]) > int(out['timestamp'].iloc[0]):
+        out = out.iloc[1:]
+
+    out['datetime'] = pd.to_datetime(out['timestamp'], unit='s')
+    return out.reset_index(drop=True)
+
+
+class CandleResampler:
+    """
+    Keeps one base series and derived higher timeframes in ring buffers,
+    updating them incrementally: only the buckets touched by newly arrived
+    base bars are recomputed.
+
+    The base buffer only needs to hold the current bucket of the largest
+    timeframe; every timeframe keeps its own `capacity` most recent bars.
+    """
+    def __init__(self, base_timeframe='15m', timeframes=('15m', '1h', '4h', '1D'),
+                 capacity=300, columns=OHLCV_COLUMNS, offset=0):
+        self.base_timeframe = base_timeframe
+        self.timeframes = [tf for tf in timeframes if tf != base_timeframe]
+        self.offset = offset
+
+        base_seconds = TIMEFRAME_SECONDS[base_timeframe]
+        for tf in self.timeframes:
+            if TIMEFRAME_SECONDS[tf] % base_seconds != 0:
+                raise ValueError(f"Cannot build {tf} from {base_timeframe}")
+        largest = max([TIMEFRAME_SECONDS[tf] for tf in self.timeframes] + [base_seconds])
+        self.base = CandleRingBuffer(max(capacity, largest // base_seconds + 1), columns)
+        self.frames = {tf: CandleRingBuffer(capacity, columns) for tf in self.timeframes}
+
+    def update(self, new_bars):
+        """
+        Merge new base bars (a bar with the newest stored timestamp replaces it,
+        e.g. the forming candle) and refresh the affected higher-timeframe buckets.
+        Bars older than the newest stored bar are ignored.
+        """
+        if new_bars is None or new_bars.empty:
+            return
+
+        new_bars = new_bars.drop_duplicates(subset='timestamp', keep='last').sort_values('timestamp')
+        last = self.base.last_timestamp
+        if last is not None:
+            new_bars = new_bars[new_bars['timestamp'] >= last]
+            if new_bars.empty:
+                return
+            # Polling an unchanged forming bar must not invalidate derived state
+            if len(new_bars) == 1:
+                stored = self.base.last()
+                row = new_bars.iloc[0]
+                if all(float(row[c]) == stored[c] for c in OHLCV_COLUMNS):
+                    return
+
+        seeding = last is None
+        first_new = int(new_bars['timestamp'].iloc[0])
+        new_ts = new_bars['timestamp'].to_numpy(dtype=np.int64)
+        new_cols = {c: new_bars[c].to_numpy(dtype=np.float64) for c in OHLCV_COLUMNS}
+
+        # Stored base bars of each affected bucket (read before extend, which may
+        # push them out of the base buffer when many bars arrive at once)
+        prior = {}
+        if not seeding:
+            base_ts = self.base.timestamps
+            j = int(np.searchsorted(base_ts, first_new, side='left'))
+            for tf in self.frames:
+                cutoff = int(bucket_start(first_new, tf, self.offset))
+                i = int(np.searchsorted(base_ts, cutoff, side='left'))
+                prior[tf] = (cutoff, base_ts[i:j].copy(), {c: self.base.column(c)[i:j].copy() for c in OHLCV_COLUMNS})
+        self.base.extend(new_bars)
+
+        for tf, frame in self.frames.items():
+            if seeding:
+                # Initial history may be much longer than the base buffer keeps
+                ts, matrix = aggregate_ohlcv(new_ts, new_cols, tf, self.offset)
+                if len(ts) and first_new > ts[0]:
+                    ts, matrix = ts[1:], matrix[1:]
+            else:
+                cutoff, prior_ts, prior_cols = prior[tf]
+                ts, matrix = aggregate_ohlcv(
+                    np.concatenate([prior_ts, new_ts]),
+                    {c: np.concatenate([prior_cols[c], new_cols[c]]) for c in OHLCV_COLUMNS},
+                    tf, self.offset)
+                frame.truncate_from(cutoff)
+            frame.append_many(ts, matrix, OHLCV_COLUMNS)
+
+    def buffer(self, timeframe):
+        if timeframe == self.base_timeframe:
+            return self.base
+        return self.frames[timeframe]
+
+    def get(self, timeframe, limit=None, columns=OHLCV_COLUMNS):
+        """
+        DataFrame copy of the series for `timeframe` (the base or a derived one).
+        """
+        df = self.buffer(timeframe).to_frame(limit, columns)
+        if timeframe != self.base_timeframe:
+            last_base_end = (self.last_timestamp or 0) + TIMEFRAME_SECONDS[self.base_timeframe]
+            df['is_partial'] = (df['timestamp'] + TIMEFRAME_SECONDS[timeframe]) > last_base_end
+        return df
+
+    @property
+    def last_timestamp(self):
+        return self.base.last_timestamp
@@ -0,0 +1,206 @@
+
+import numpy as np
+import pandas as pd
+
+OHLCV_COLUMNS = ('open', 'high', 'low', 'close', 'volume')
+
+
+class CandleRingBuffer:
+    """
+    Fixed-capacity columnar buffer for one symbol/timeframe.
+
+    Every row is written twice (at i and i + capacity), so the newest `len(self)`
+    rows are always one contiguous slice: column views are zero-copy and
+    append / update of the last bar are O(1). Memory is allocated once.
+    `version` increases on every change to the bars (not on set_column), so
+    callers can tell whether derived data such as indicators is stale.
+    """
+    __slots__ = ('capacity', 'columns', 'version', '_col_index', '_timestamps', '_data', '_head', '_size')
+
+    def __init__(self, capacity, columns=OHLCV_COLUMNS):
+        self.capacity = capacity
+        self.columns = tuple(columns)
+        self._col_index = {name: i for i, name in enumerate(self.columns)}
+        self._timestamps = np.zeros(2 * capacity, dtype=np.int64)
+        self._data = np.full((len(self.columns), 2 * capacity), np.nan, dtype=np.float64)
+        self._head = 0  # next write position in [0, capacity)
+        self._size = 0
+        self.version = 0
+
+    def __len__(self):
+        return self._size
+
+    @property
+    def nbytes(self):
+        return self._timestamps.nbytes + self._data.nbytes
+
+    def _window(self):
+        start = (self._head - self._size) % self.capacity
+        return start, start + self._size
+
+    def _last_pos(self):
+        return (self._head - 1) % self.capacity
+
+    def _write(self, pos, timestamp, values):
+        mirror = pos + self.capacity
+        self._timestamps[pos] = self._timestamps[mirror] = timestamp
+        # Columns not given (e.g. indicators not computed yet) are reset to NaN
+        self._data[:, pos] = np.nan
+        for name, value in values.items():
+            i = self._col_index.get(name)
+            if i is not None:
+                self._data[i, pos] = value
+        self._data[:, mirror] = self._data[:, pos]
+        self.version += 1
+
+    def append(self, timestamp, values):
+        """
+        Add a new bar. values: dict of column -> value (missing columns become NaN)
+        """
+        self._write(self._head, timestamp, values)
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def append_many(self, timestamps, matrix, names=None):
+        """
+        Vectorized append of n bars (timestamps must be newer than the last bar).
+        matrix: one row per bar, columns in `names` order (default: self.columns)
+        """
+        if names is not None and tuple(names) != self.columns:
+            full = np.full((len(matrix), len(self.columns)), np.nan, dtype=np.float64)
+            for j, name in enumerate(names):
+                full[:, self._col_index[name]] = matrix[:, j]
+            matrix = full
+        timestamps = timestamps[-self.capacity:]
+        matrix = matrix[-self.capacity:]
+        n = len(timestamps)
+        if not n:
+            return
+        pos = (self._head + np.arange(n)) % self.capacity
+        for offset in (0, self.capacity):
+            self._timestamps[pos + offset] = timestamps
+            self._data[:, pos + offset] = matrix.T
+        self._head = (self._head + n) % self.capacity
+        self._size = min(self._size + n, self.capacity)
+        self.version += 1
+
+    def update_last(self, values):
+        """
+        Overwrite columns of the newest bar in place (e.g. the forming candle).
+        """
+        if not self._size:
+            raise IndexError("update_last on empty buffer")
+        pos = self._last_pos()
+        for name, value in values.items():
+            i = self._col_index.get(name)
+            if i is not None:
+                self._data[i, pos] = self._data[i, pos + self.capacity] = value
+        self.version += 1
+
+    def upsert(self, timestamp, values):
+        """
+        Append a newer bar, or replace the newest bar if the timestamp matches.
+        Bars older than the newest one are ignored; returns True if stored.
+        """
+        last = self.last_timestamp
+        if last is None or timestamp > last:
+            self.append(timestamp, values)
+        elif timestamp == last:
+            self._write(self._last_pos(), timestamp, values)
+        else:
+            return False
+        return True
+
+    def extend(self, df):
+        """
+        Upsert every row of a DataFrame with a 'timestamp' column (sorted ascending).
+        """
+        if df is None or df.empty:
+            return
+        timestamps = df['timestamp'].to_numpy(dtype=np.int64)
+        matrix = np.full((len(df), len(self.columns)), np.nan, dtype=np.float64)
+        for i, name in enumerate(self.columns):
+            if name in df.columns:
+                matrix[:, i] = df[name].to_numpy(dtype=np.float64)
+
+        last = self.last_timestamp
+        if last is not None:
+            same = timestamps == last
+            if same.any():
+                self._write(self._last_pos(), last, dict(zip(self.columns, matrix[same][-1])))
+            newer = timestamps > last
+            timestamps, matrix = timestamps[newer], matrix[newer]
+        self.append_many(timestamps, matrix)
+
+    def truncate_from(self, timestamp):
+        """
+        Drop all bars with timestamp >= `timestamp` (used before rewriting a tail).
+        """
+        ts = self.timestamps
+        drop = len(ts) - int(np.searchsorted(ts, timestamp, side='left'))
+        self._head = (self._head - drop) % self.capacity
+        self._size -= drop
+        if drop:
+            self.version += 1
+
+    def set_column(self, name, values):
+        """
+        Write the last len(values) entries of a column (e.g. freshly computed indicators).
+        """
+        if not self._size:
+            return
+        values = np.asarray(values, dtype=np.float64)[-self._size:]
+        start, end = self._window()
+        i = self._col_index[name]
+        pos = np.arange(end - len(values), end)
+        self._data[i, pos] = values
+        # Keep the mirror half consistent with what was just written
+        mirror = np.where(pos < self.capacity, pos + self.capacity, pos - self.capacity)
+        self._data[i, mirror] = values
+
+    @property
+    def timestamps(self):
+        start, end = self._window()
+        return self._timestamps[start:end]
+
+    @property
+    def last_timestamp(self):
+        if not self._size:
+            return None
+        return int(self._timestamps[self._last_pos()])
+
+    def column(self, name):
+        """
+        Zero-copy read-only view of a column, oldest to newest.
+        """
+        start, end = self._window()
+        view = self._data[self._col_index[name], start:end]
+        view.flags.writeable = False
+        return view
+
+    def last(self):
+        """
+        Newest bar as a dict (no DataFrame construction).
+        """
+        if not self._size:
+            return {}
+        pos = self._last_pos()
+        row = {name: float(self._data[i, pos]) for name, i in self._col_index.items()}
+        row['timestamp'] = int(self._timestamps[pos])
+        return row
+
+    def to_frame(self, limit=None, columns=None):
+        """
+        Copy the buffer into a DataFrame shaped like BitkubService.get_candles output
+        (for charts, calculate_indicators and check_signals).
+        columns: subset of columns to include (default: all)
+        """
+        start, end = self._window()
+        if limit:
+            start = max(start, end - limit)
+        columns = tuple(columns) if columns else self.columns
+        rows = [self._col_index[name] for name in columns]
+        df = pd.DataFrame(self._data[rows, start:end].T.copy(), columns=columns)
+        df.insert(0, 'timestamp', self._timestamps[start:end].copy())
+        df['datetime'] = pd.to_datetime(df['timestamp'], unit='s')
+        return df
@@ -0,0 +1,174 @@
+
+import numpy as np
+from collections import namedtuple
+
+# Structured signal output
+Signal = namedtuple('Signal', ['rule_id', 'direction', 'severity', 'message'])
+
+BUY = 'buy'
+SELL = 'sell'
+
+# Rule definitions: plain data, compiled once by RuleSet.
+#   when: a condition
+#     {'above': [a, b]} / {'below': [a, b]}              a > b / a < b on the last bar
+#     {'cross_above': [a, b]} / {'cross_below': [a, b]}  a crosses b between the last two bars
+#     {'all': [cond, ...]} / {'any': [cond, ...]} / {'not': cond}
+#   operands are column names (e.g. 'RSI', 'EMA200') or numbers; frames annotated by
+#   CorrelationEngine also carry 'BTC_CORR' / 'BTC_BETA', e.g. {'below': ['BTC_CORR', 0.3]}
+#   severity: 1 = trend filter, 2 = threshold, 3 = crossover
+DEFAULT_RULES = [
+    {'id': 'rsi_oversold', 'when': {'below': ['RSI', 30]}, 'direction': BUY, 'severity': 2,
+     'message': "RSI ต่ำกว่า 30 (Oversold - สัญญาณซื้อ)"},
+    {'id': 'rsi_overbought', 'when': {'above': ['RSI', 70]}, 'direction': SELL, 'severity': 2,
+     'message': "RSI สูงกว่า 70 (Overbought - สัญญาณขาย)"},
+    {'id': 'ema_golden_cross', 'when': {'cross_above': ['EMA12', 'EMA26']}, 'direction': BUY, 'severity': 3,
+     'message': "EMA Golden Cross (12 ตัด 26 ขึ้น - สัญญาณซื้อ)"},
+    {'id': 'ema_death_cross', 'when': {'cross_below': ['EMA12', 'EMA26']}, 'direction': SELL, 'severity': 3,
+     'message': "EMA Death Cross (12 ตัด 26 ลง - สัญญาณขาย)"},
+    {'id': 'above_ema200', 'when': {'above': ['close', 'EMA200']}, 'direction': BUY, 'severity': 1,
+     'message': "ราคาอยู่เหนือ EMA200 (แนวโน้มขาขึ้น)"},
+    {'id': 'below_ema200', 'when': {'below': ['close', 'EMA200']}, 'direction': SELL, 'severity': 1,
+     'message': "ราคาอยู่ต่ำกว่า EMA200 (แนวโน้มขาลง)"},
+]
+
+_COMPARISONS = {'above': np.greater, 'below': np.less}
+_CROSSES = ('cross_above', 'cross_below')
+
+
+def _compile_operand(value, columns):
+    if isinstance(value, str):
+        columns.add(value)
+        # Missing columns (e.g. EMA200 on short history) evaluate as NaN -> False
+        return lambda cols, shape: cols.get(value, np.full(shape, np.nan))
+    value = float(value)
+    return lambda cols, shape: value
+
+
+def compile_condition(cond, columns=None):
+    """
+    Compile a condition dict into fn(cols, shape) -> bool array over the last axis.
+    cols: dict of column name -> float array; shape: shape of those arrays.
+    columns (optional set) collects the column names the condition reads.
+    """
+    if columns is None:
+        columns = set()
+    if not isinstance(cond, dict) or len(cond) != 1:
+        raise ValueError(f"Condition must be a single-key dict: {cond!r}")
+    (op, args), = cond.items()
+
+    if op in ('all', 'any'):
+        subs = [compile_condition(c, columns) for c in args]
+        reduce = np.logical_and.reduce if op == 'all' else np.logical_or.reduce
+        return lambda cols, shape: reduce([f(cols, shape) for f in subs])
+
+    if op == 'not':
+        sub = compile_condition(args, columns)
+        return lambda cols, shape: ~sub(cols, shape)
+
+    if op in _COMPARISONS or op in _CROSSES:
+        if len(args) != 2:
+            raise ValueError(f"'{op}' takes two operands: {args!r}")
+        a, b = (_compile_operand(x, columns) for x in args)
+
+        if op in _COMPARISONS:
+            compare = _COMPARISONS[op]
+            return lambda cols, shape: np.broadcast_to(compare(a(cols, shape), b(cols, shape)), shape)
+
+        def cross(cols, shape):
+            diff = np.broadcast_to(np.subtract(a(cols, shape), b(cols, shape)), shape)
+            if op == 'cross_above':
+                hit = (diff[..., :-1] < 0) & (diff[..., 1:] > 0)
+            else:
+                hit = (diff[..., :-1] > 0) & (diff[..., 1:] < 0)
+            # The first bar has no previous bar to cross from
+            pad = np.zeros(shape[:-1] + (1,), dtype=bool)
+            return np.concatenate([pad, hit], axis=-1)
+        return cross
+
+    raise ValueError(f"Unknown condition operator: {op!r}")
+
+
+class RuleSet:
+    """
+    A list of rule definitions compiled once into vectorized evaluators.
+    """
+    def __init__(self, rules=DEFAULT_RULES):
+        self.rules = []
+        self.columns = set()
+        for rule in rules:
+            if rule.get('direction') not in (BUY, SELL, None):
+                raise ValueError(f"Rule {rule.get('id')}: direction must be '{BUY}', '{SELL}' or None")
+            evaluator = compile_condition(rule['when'], self.columns)
+            self.rules.append((rule, evaluator))
+
+    def _columns(self, df, tail=None):
+        rows = df if tail is None else df.iloc[-tail:]
+        return {name: rows[name].to_numpy(dtype=float) for name in self.columns if name in df.columns}
+
+    def _signals(self, rule_hits):
+        return [
+            Signal(rule['id'], rule.get('direction'), rule.get('severity', 1), rule.get('message', rule['id']))
+            for rule, hit in rule_hits if hit
+        ]
+
+    def evaluate_series(self, df):
+        """
+        Evaluate every rule on every bar.
+        returns: dict of rule id -> bool array (one entry per row of df)
+        """
+        cols = self._columns(df)
+        shape = (len(df),)
+        return {rule['id']: evaluator(cols, shape) for rule, evaluator in self.rules}
+
+    def evaluate(self, df):
+        """
+        Signals that fire on the newest bar of df (only the last two rows are read).
+        """
+        if df.empty or len(df) < 2:
+            return []
+        cols = self._columns(df, tail=2)
+        return self._signals((rule, evaluator(cols, (2,))[-1]) for rule, evaluator in self.rules)
+
+    def evaluate_batch(self, frames):
+        """
+        Evaluate all rules for many symbols at once.
+        frames: dict of symbol -> DataFrame with indicator columns
+        returns: dict of symbol -> list of Signal for the newest bar
+        """
+        symbols = [sym for sym, df in frames.items() if df is not None and len(df) >= 2]
+        results = {sym: [] for sym in frames}
+        if not symbols:
+            return results
+
+        shape = (len(symbols), 2)
+        cols = {}
+        for name in self.columns:
+            stacked = np.full(shape, np.nan)
+            for i, sym in enumerate(symbols):
+                df = frames[sym]
+                if name in df.columns:
+                    stacked[i] = df[name].iloc[-2:].to_numpy(dtype=float)
+            cols[name] = stacked
+
+        hits = [(rule, evaluator(cols, shape)[:, -1]) for rule, evaluator in self.rules]
+        for i, sym in enumerate(symbols):
+            results[sym] = self._signals((rule, hit[i]) for rule, hit in hits)
+        return results
+
+
+def summarize_direction(signals):
+    """
+    Overall direction of a list of Signal: 'buy', 'sell', 'mixed' or None.
+    """
+    has_buy = any(s.direction == BUY for s in signals)
+    has_sell = any(s.direction == SELL for s in signals)
+    if has_buy and has_sell:
+        return 'mixed'
+    if has_buy:
+        return BUY
+    if has_sell:
+        return SELL
+    return None
+
+
+DEFAULT_RULESET = RuleSet(DEFAULT_RULES)
@@ -0,0 +1,335 @@
+
+import os
+import zlib
+import struct
+import threading
+import numpy as np
+import pandas as pd
+
+# Chunk header: magic, trade count, first/last timestamp, first scaled price,
+# price/amount scale exponents, timestamp-delta dtype, price-delta dtype, payload length
+_HEADER = struct.Struct('<4sIqqqbbccI')
+_MAGIC = b'TCK2'
+_INT_TYPES = [(b'b', np.int8), (b'h', np.int16), (b'i', np.int32), (b'q', np.int64)]
+_DTYPES = dict(_INT_TYPES)
+
+# Side log of trades not sealed into a chunk yet: the .tick file size it continues,
+# then one raw record per trade (timestamp, price, amount, is_buy)
+_LOG_HEADER = struct.Struct('<q')
+_LOG_RECORD = struct.Struct('<qdd?')
+
+# Largest scale exponent tried per chunk (prices / amounts are stored as value * 10**decimals)
+MAX_DECIMALS = 8
+
+
+def _smallest_int(values):
+    """
+    (code, dtype) of the narrowest signed integer type that holds all values.
+    """
+    lo, hi = (int(values.min()), int(values.max())) if len(values) else (0, 0)
+    for code, dtype in _INT_TYPES:
+        info = np.iinfo(dtype)
+        if info.min <= lo and hi <= info.max:
+            return code, dtype
+    return _INT_TYPES[-1]
+
+
+def _decimals(values):
+    """
+    Fewest decimals (up to MAX_DECIMALS) that represent every value exactly,
+    e.g. 2 for THB prices like 3512345.67. Keeps the scaled integers small.
+    """
+    for decimals in range(MAX_DECIMALS + 1):
+        scaled = values * 10 ** decimals
+        if np.allclose(scaled, np.round(scaled), rtol=0, atol=1e-6):
+            return decimals
+    return MAX_DECIMALS
+
+
+def encode_chunk(timestamps, prices, amounts, is_buy):
+    """
+    Columnar chunk: delta-encoded timestamps and scaled prices (narrowest int type,
+    first values kept in the header), scaled amounts, bit-packed sides, zlib-compressed.
+    """
+    ts = np.asarray(timestamps, dtype=np.int64)
+    prices = np.asarray(prices, dtype=np.float64)
+    amounts = np.asarray(amounts, dtype=np.float64)
+    price_decimals = _decimals(prices)
+    amount_decimals = _decimals(amounts)
+    price_int = np.round(prices * 10 ** price_decimals).astype(np.int64)
+    amount_int = np.round(amounts * 10 ** amount_decimals).astype(np.int64)
+
+    ts_delta = np.diff(ts, prepend=ts[0])
+    price_delta = np.diff(price_int, prepend=price_int[0])
+    ts_code, ts_dtype = _smallest_int(ts_delta)
+    price_code, price_dtype = _smallest_int(price_delta)
+
+    payload = zlib.compress(b''.join([
+        ts_delta.astype(ts_dtype).tobytes(),
+        price_delta.astype(price_dtype).tobytes(),
+        amount_int.tobytes(),
+        np.packbits(np.asarray(is_buy, dtype=bool)).tobytes()
+    ]), 6)
+    header = _HEADER.pack(_MAGIC, len(ts), int(ts[0]), int(ts[-1]), int(price_int[0]),
+                          price_decimals, amount_decimals, ts_code, price_code, len(payload))
+    return header + payload
+
+
+def decode_chunk(header, payload):
+    magic, n, ts_first, _, price_first, price_decimals, amount_decimals, ts_code, price_code, _ = header
+    raw = zlib.decompress(payload)
+    ts_dtype, price_dtype = _DTYPES[ts_code], _DTYPES[price_code]
+
+    offset = 0
+    ts_delta = np.frombuffer(raw, dtype=ts_dtype, count=n, offset=offset).astype(np.int64)
+    offset += n * np.dtype(ts_dtype).itemsize
+    price_delta = np.frombuffer(raw, dtype=price_dtype, count=n, offset=offset).astype(np.int64)
+    offset += n * np.dtype(price_dtype).itemsize
+    amount_int = np.frombuffer(raw, dtype=np.int64, count=n, offset=offset)
+    offset += n * 8
+    is_buy = np.unpackbits(np.frombuffer(raw, dtype=np.uint8, offset=offset))[:n].astype(bool)
+
+    ts_delta[0] = ts_first
+    price_delta[0] = price_first
+    return (np.cumsum(ts_delta),
+            np.cumsum(price_delta) / 10 ** price_decimals,
+            amount_int / 10 ** amount_decimals,
+            is_buy)
+
+
+class TickArchive:
+    """
+    Append-only per-symbol trade log (<root>/<symbol>.tick).
+
+    Trades are buffered and sealed into compressed chunks of `chunk_size`
+    trades. A chunk index (first/last timestamp, file offset) is rebuilt from
+    the headers on open, so time-range scans only decompress the chunks that
+    overlap the range. Unsealed trades are included in scans; flush() writes
+    them to a small raw side log (<symbol>.pending) that is reloaded on open,
+    so slow pairs do not end up as many tiny, poorly compressed chunks.
+    """
+    def __init__(self, root=os.path.join("data", "ticks"), chunk_size=2000):
+        self.root = root
+        self.chunk_size = chunk_size
+        self.index = {}    # symbol -> list of (ts_first, ts_last, offset, header)
+        self.pending = {}  # symbol -> list of (timestamp, price, amount, is_buy)
+        self.logged = {}   # symbol -> number of pending trades already in the side log
+        self.lock = threading.Lock()
+        os.makedirs(root, exist_ok=True)
+
+    def _path(self, symbol):
+        return os.path.join(self.root, f"{symbol}.tick")
+
+    def _log_path(self, symbol):
+        return os.path.join(self.root, f"{symbol}.pending")
+
+    def _sealed_end(self, entries):
+        if not entries:
+            return 0
+        _, _, offset, header = entries[-1]
+        return offset + _HEADER.size + header[-1]
+
+    def _load_index(self, symbol):
+        if symbol in self.index:
+            return self.index[symbol]
+        entries = []
+        path = self._path(symbol)
+        if os.path.exists(path):
+            with open(path, 'rb') as f:
+                size = os.fstat(f.fileno()).st_size
+                while f.tell() + _HEADER.size <= size:
+                    offset = f.tell()
+                    header = _HEADER.unpack(f.read(_HEADER.size))
+                    if header[0] != _MAGIC or offset + _HEADER.size + header[-1] > size:
+                        # Torn write at the end of the file: ignore the partial chunk
+                        print(f"TickArchive: truncated chunk in {path} at {offset}")
+                        break
+                    entries.append((header[2], header[3], offset, header))
+                    f.seek(header[-1], os.SEEK_CUR)
+        self.index[symbol] = entries
+        self._load_log(symbol, self._sealed_end(entries))
+        return entries
+
+    def _load_log(self, symbol, sealed_end):
+        """
+        Reload unsealed trades from the side log. A log that continues an older
+        file size was already sealed (crash before the log was reset): skip it.
+        """
+        pending = self.pending.setdefault(symbol, [])
+        path = self._log_path(symbol)
+        if not os.path.exists(path):
+            return
+        with open(path, 'rb') as f:
+            data = f.read()
+        if len(data) < _LOG_HEADER.size or _LOG_HEADER.unpack_from(data)[0] != sealed_end:
+            self._reset_log(symbol, sealed_end)
+            return
+        # A torn last record is dropped
+        count = (len(data) - _LOG_HEADER.size) // _LOG_RECORD.size
+        trades = [_LOG_RECORD.unpack_from(data, _LOG_HEADER.size + i * _LOG_RECORD.size) for i in range(count)]
+        pending[:0] = trades
+        self.logged[symbol] = len(trades)
+
+    def _reset_log(self, symbol, sealed_end):
+        path = self._log_path(symbol)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(_LOG_HEADER.pack(sealed_end))
+        os.replace(tmp_path, path)
+
+    def append(self, symbol, trades):
+        """
+        trades: iterable of (timestamp, price, amount, is_buy), oldest first
+        """
+        with self.lock:
+            self._load_index(symbol)
+            pending = self.pending[symbol]
+            pending.extend(trades)
+            if len(pending) >= self.chunk_size:
+                self._seal(symbol)
+
+    def flush(self, symbol=None):
+        """
+        Persist unsealed trades to the side log (chunks are only sealed when full).
+        """
+        with self.lock:
+            for sym in ([symbol] if symbol else list(self.pending)):
+                self._flush(sym)
+
+    def _flush(self, symbol):
+        pending = self.pending.get(symbol)
+        logged = self.logged.get(symbol, 0)
+        if not pending or logged >= len(pending):
+            return
+        path = self._log_path(symbol)
+        if not os.path.exists(path):
+            self._reset_log(symbol, self._sealed_end(self._load_index(symbol)))
+        with open(path, 'ab') as f:
+            f.write(b''.join(_LOG_RECORD.pack(*t) for t in pending[logged:]))
+        self.logged[symbol] = len(pending)
+
+    def _seal(self, symbol):
+        pending = self.pending.get(symbol)
+        if not pending:
+            return
+        entries = self._load_index(symbol)
+        pending.sort(key=lambda t: t[0])
+        ts, prices, amounts, is_buy = (np.array(col) for col in zip(*pending))
+        chunk = encode_chunk(ts, prices, amounts, is_buy)
+
+        offset = self._sealed_end(entries)
+        with open(self._path(symbol), 'ab') as f:
+            f.truncate(offset)  # drop a torn chunk left by a crash
+            f.write(chunk)
+        header = _HEADER.unpack(chunk[:_HEADER.size])
+        entries.append((header[2], header[3], offset, header))
+        self.pending[symbol] = []
+        self.logged[symbol] = 0
+        self._reset_log(symbol, offset + len(chunk))
+
+    def scan(self, symbol, from_ts=None, to_ts=None):
+        """
+        Trades in [from_ts, to_ts] as a DataFrame: timestamp, price, amount, is_buy.
+        """
+        lo = from_ts if from_ts is not None else -2 ** 63
+        hi = to_ts if to_ts is not None else 2 ** 63 - 1
+        columns = [[], [], [], []]
+
+        with self.lock:
+            entries = [e for e in self._load_index(symbol) if e[1] >= lo and e[0] <= hi]
+            pending = list(self.pending.get(symbol, []))
+
+        if entries:
+            with open(self._path(symbol), 'rb') as f:
+                for _, _, offset, header in entries:
+                    f.seek(offset + _HEADER.size)
+                    for col, values in zip(columns, decode_chunk(header, f.read(header[-1]))):
+                        col.append(values)
+        if pending:
+            for col, values in zip(columns, zip(*sorted(pending, key=lambda t: t[0]))):
+                col.append(np.array(values))
+
+        if not columns[0]:
+            return pd.DataFrame(columns=['timestamp', 'price', 'amount', 'is_buy'])
+        df = pd.DataFrame({
+            'timestamp': np.concatenate(columns[0]).astype(np.int64),
+            'price': np.concatenate(columns[1]).astype(np.float64),
+            'amount': np.concatenate(columns[2]).astype(np.float64),
+            'is_buy': np.concatenate(columns[3]).astype(bool)
+        })
+        df = df[(df['timestamp'] >= lo) & (df['timestamp'] <= hi)]
+        return df.sort_values('timestamp', kind='stable').reset_index(drop=True)
+
+    def last_timestamp(self, symbol):
+        """
+        Newest recorded timestamp (flushed or pending), None if nothing is recorded.
+        """
+        with self.lock:
+            last = [e[1] for e in self._load_index(symbol)[-1:]]
+            pending_ts = [t[0] for t in self.pending.get(symbol, [])]
+        return max(last + pending_ts, default=None)
+
+    def recent(self, symbol, limit=20):
+        """
+        Newest `limit` trades, newest first (like /api/v3/market/trades).
+        """
+        newest = self.last_timestamp(symbol)
+        if newest is None:
+            return pd.DataFrame(columns=['timestamp', 'price', 'amount', 'is_buy'])
+        df = self.scan(symbol, newest - 24 * 3600, None)
+        return df.iloc[::-1].head(limit).reset_index(drop=True)
+
+
+def _bucket(df, interval):
+    return df['timestamp'] // interval * interval
+
+
+def vwap(df, interval=60):
+    """
+    Volume-weighted average price per `interval` seconds.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['timestamp', 'vwap', 'volume'])
+    notional = (df['price'] * df['amount']).groupby(_bucket(df, interval)).sum()
+    volume = df['amount'].groupby(_bucket(df, interval)).sum()
+    out = pd.DataFrame({'vwap': notional / volume, 'volume': volume})
+    out.index.name = 'timestamp'
+    return out.reset_index()
+
+
+def volume_bars(df, bar_volume):
+    """
+    OHLCV bars that each close after `bar_volume` units have traded.
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['timestamp', 'open', 'high', 'low', 'close', 'volume'])
+    bar_id = (df['amount'].cumsum().shift(fill_value=0) // bar_volume).astype(np.int64)
+    grouped = df.groupby(bar_id)
+    out = pd.DataFrame({
+        'timestamp': grouped['timestamp'].first(),
+        'open': grouped['price'].first(),
+        'high': grouped['price'].max(),
+        'low': grouped['price'].min(),
+        'close': grouped['price'].last(),
+        'volume': grouped['amount'].sum()
+    })
+    return out.reset_index(drop=True)
+
+
+def trade_imbalance(df, interval=60):
+    """
+    (buy volume - sell volume) / total volume per `interval` seconds, in [-1, 1].
+    """
+    if df.empty:
+        return pd.DataFrame(columns=['timestamp', 'imbalance', 'buy_volume', 'sell_volume'])
+    signed = df['amount'].where(df['is_buy'], -df['amount'])
+    bucket = _bucket(df, interval)
+    buy = df['amount'].where(df['is_buy'], 0).groupby(bucket).sum()
+    sell = df['amount'].where(~df['is_buy'], 0).groupby(bucket).sum()
+    out = pd.DataFrame({
+        'imbalance': signed.groupby(bucket).sum() / (buy + sell),
+        'buy_volume': buy,
+        'sell_volume': sell
+    })
+    out.index.name = 'timestamp'
+    return out.reset_index()
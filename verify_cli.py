@@ -6,7 +6,10 @@ import os
 sys.path.append(os.path.join(os.getcwd(), 'monitor'))
 
 from services.bitkub_service import BitkubService
+from services.backfill_service import BackfillService
 from utils.indicators import calculate_indicators, check_signals
+from utils.ring_buffer import CandleRingBuffer
+from utils.tick_archive import TickArchive, encode_chunk, decode_chunk, _HEADER
 
 def main():
     print("--- Starting Verification ---")
@@ -77,7 +80,133 @@ def main():
     else:
         print("❌ Failed to fetch candles.")
 
+    # 6. Test Chunked Backfill (15m needs many requests for the same range)
+    print("\n6. Testing Chunked Backfill (BTC_THB, 15m, 30 days)...")
+    backfill = BackfillService(cache_dir=None)
+    df_bf = backfill.backfill('BTC_THB', '15m', end_ts - 30 * 24 * 3600, end_ts)
+    if not df_bf.empty:
+        print(f"✅ Success. Received {len(df_bf)} candles, {len(df_bf.attrs['gaps'])} gap(s).")
+    else:
+        print("❌ Failed to backfill candles.")
+
+    # 7. Test Ring Buffer wraparound (offline)
+    print("\n7. Testing Ring Buffer wraparound / truncate...")
+    if verify_ring_buffer():
+        print("✅ Success. Views, truncate_from and set_column stay consistent after wrapping.")
+    else:
+        print("❌ Ring buffer contents differ from the expected bars.")
+
+    # 8. Test Tick Archive encode/decode round-trip (offline)
+    print("\n8. Testing Tick Archive round-trip...")
+    if verify_tick_archive():
+        print("✅ Success. Trades decode exactly as recorded (chunks and archive file).")
+    else:
+        print("❌ Decoded trades differ from the recorded ones.")
+
     print("\n--- Verification Complete ---")
 
+def verify_ring_buffer():
+    """
+    Fill a small buffer past its capacity several times and compare every read
+    path (column views, to_frame, last) with a plain list of the expected bars.
+    """
+    import numpy as np
+
+    capacity = 5
+    buffer = CandleRingBuffer(capacity, ('close', 'RSI'))
+    expected = []  # (timestamp, close) of every bar, oldest first
+
+    def check():
+        tail = expected[-capacity:]
+        ts = [t for t, _ in tail]
+        closes = [c for _, c in tail]
+        frame = buffer.to_frame()
+        return (len(buffer) == len(tail)
+                and list(buffer.timestamps) == ts
+                and list(buffer.column('close')) == closes
+                and list(frame['close']) == closes
+                and (not tail or buffer.last()['timestamp'] == ts[-1]))
+
+    ok = True
+    for i in range(12):
+        buffer.append(i * 60, {'close': float(i)})
+        expected.append((i * 60, float(i)))
+        ok = ok and check()
+
+    # Vectorized append that wraps around the end of the storage (head ends at slot 1)
+    ts = np.arange(12, 16) * 60
+    buffer.append_many(ts, np.column_stack([ts / 60.0, np.full(len(ts), np.nan)]))
+    expected.extend((int(t), t / 60.0) for t in ts)
+    ok = ok and check()
+
+    # Drop the newest bars so the head moves back across slot 0, then append again
+    buffer.truncate_from(14 * 60)
+    expected = [bar for bar in expected[-capacity:] if bar[0] < 14 * 60]
+    ok = ok and check()
+    buffer.upsert(13 * 60, {'close': 99.0})
+    expected[-1] = (13 * 60, 99.0)
+    for i in (14, 15):
+        buffer.append(i * 60, {'close': float(i)})
+        expected.append((i * 60, float(i)))
+    ok = ok and check()
+
+    # set_column writes both mirrored copies: as later appends move the window
+    # start through every slot (and back to 0) it must keep seeing the same values
+    buffer.set_column('RSI', np.arange(capacity, dtype=float))
+    ok = ok and list(buffer.column('RSI')) == list(range(capacity))
+    for k in range(1, capacity):
+        buffer.append((15 + k) * 60, {'close': float(15 + k)})
+        expected.append(((15 + k) * 60, float(15 + k)))
+        ok = ok and check() and list(buffer.column('RSI')[:-k]) == list(range(k, capacity))
+
+    buffer.truncate_from(0)
+    expected = []
+    return ok and check()
+
+def verify_tick_archive():
+    """
+    Encode synthetic trades (a BTC-sized and a sub-baht price series) and check
+    that decoding returns exactly the same values, both for a single chunk and
+    through a TickArchive file reopened from disk.
+    """
+    import shutil
+    import tempfile
+    import numpy as np
+
+    rng = np.random.default_rng(0)
+    n = 5000
+    ts = 1700000000 + np.cumsum(rng.integers(0, 3, n))
+    series = {
+        'BTC_THB': np.round(3500000 + np.cumsum(rng.normal(0, 50, n)), 2),
+        'SHIB_THB': np.round(0.0003 + np.abs(np.cumsum(rng.normal(0, 1e-7, n))), 8)
+    }
+    amounts = np.round(rng.uniform(0, 2, n), 8)
+    is_buy = rng.random(n) < 0.5
+
+    def same(decoded, prices):
+        return (np.array_equal(decoded[0], ts) and np.array_equal(decoded[1], prices)
+                and np.array_equal(decoded[2], amounts) and np.array_equal(decoded[3], is_buy))
+
+    ok = True
+    for prices in series.values():
+        chunk = encode_chunk(ts, prices, amounts, is_buy)
+        header = _HEADER.unpack(chunk[:_HEADER.size])
+        ok = ok and same(decode_chunk(header, chunk[_HEADER.size:]), prices)
+
+    root = tempfile.mkdtemp()
+    try:
+        archive = TickArchive(root, chunk_size=1000)
+        for sym, prices in series.items():
+            archive.append(sym, zip(ts.tolist(), prices.tolist(), amounts.tolist(), is_buy.tolist()))
+        archive.flush()
+        reopened = TickArchive(root)
+        for sym, prices in series.items():
+            df = reopened.scan(sym)
+            ok = ok and same((df['timestamp'].to_numpy(), df['price'].to_numpy(),
+                              df['amount'].to_numpy(), df['is_buy'].to_numpy()), prices)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+    return ok
+
 if __name__ == "__main__":
     main()